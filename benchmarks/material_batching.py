@@ -0,0 +1,122 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+from pyglm import glm
+
+from config import Config
+from loader import MAX_BATCHED_MATERIALS, ObjectLoader
+from shaders import Shader
+from uniforms import CAMERA_FIELDS, SIMULATION_FIELDS, UniformBuffer
+
+ROOT = Path(__file__).parent.parent
+
+N_TRIANGLES = 100_000
+MATERIAL_COUNTS = [1, 8, 32, 128, 512, 2048]
+FRAMES = 20
+
+
+class SyntheticMesh:
+    def __init__(self, n_triangles, n_materials):
+        rng = np.random.default_rng(0)
+        # Small triangles keep the benchmark bound by draw submission, not fill rate
+        centers = rng.uniform(-1.0, 1.0, (n_triangles, 1, 3))
+        offsets = rng.uniform(-0.005, 0.005, (n_triangles, 3, 3))
+        positions = (centers + offsets).reshape(-1, 3).astype(np.float32)
+        up = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+        normals = np.tile(up, (n_triangles * 3, 1))
+
+        self.format = [("N", 3, 0), ("V", 3, 3)]
+        self.floats_per_vertex = 6
+        self.vertices = np.hstack([normals, positions]).ravel()
+        self.compact = None
+        self.grid = None
+
+        bounds = np.linspace(0, n_triangles, n_materials + 1).astype(int) * 3
+        self.records = [
+            {
+                "name": f"material{i}",
+                "ambient": rng.uniform(size=3).tolist(),
+                "diffuse": rng.uniform(size=3).tolist(),
+                "specular": [0.5, 0.5, 0.5],
+                "shininess": 32.0,
+                "vbo_range": [int(start), int(end - start)],
+            }
+            for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]))
+        ]
+
+    @property
+    def nbytes(self):
+        return self.vertices.nbytes
+
+
+def create_shader(config, batched):
+    defines = {}
+    if batched:
+        defines = {"BATCH_MATERIALS": 1, "MAX_MATERIALS": MAX_BATCHED_MATERIALS}
+    return Shader(
+        ROOT / config.shaders.vertex,
+        ROOT / config.shaders.geometry,
+        ROOT / config.shaders.fragment,
+        defines,
+    )
+
+
+def frame_time(shader, model):
+    glUseProgram(shader.program)
+    glUniform1i(shader.location("should_explode"), 1)
+
+    model.render(shader, glm.mat4(1.0))
+    glFinish()
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        glClear(GL_COLOR_BUFFER_BIT)
+        glClear(GL_DEPTH_BUFFER_BIT)
+        model.render(shader, glm.mat4(1.0))
+    glFinish()
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    config = Config.from_file()
+
+    pygame.init()
+    pygame.display.gl_set_attribute(
+        pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE
+    )
+    pygame.display.set_mode((640, 480), pygame.OPENGL | pygame.HIDDEN)
+    glEnable(GL_DEPTH_TEST)
+
+    camera = UniformBuffer("Camera", CAMERA_FIELDS)
+    camera.set("projection_matrix", glm.perspective(0.8, 4 / 3, 0.01, 100.0))
+    camera.set(
+        "view_matrix", glm.lookAt(glm.vec3(3.0), glm.vec3(0.0), glm.vec3(0, 1, 0))
+    )
+    camera.set("camera_position", glm.vec3(3.0))
+    camera.upload()
+
+    simulation = UniformBuffer("Simulation", SIMULATION_FIELDS)
+    simulation.upload()
+
+    shaders = {False: create_shader(config, False), True: create_shader(config, True)}
+
+    print(f"{N_TRIANGLES} triangles, {FRAMES} frames per measurement")
+    print(f"{'materials':>10} {'per-material':>14} {'batched':>10} {'speedup':>8}")
+    for n_materials in MATERIAL_COUNTS:
+        model = ObjectLoader(SyntheticMesh(N_TRIANGLES, n_materials))
+        separate = frame_time(shaders[False], model)
+        batched = frame_time(shaders[True], model)
+        model.close()
+        print(
+            f"{n_materials:>10} {separate * 1000:>12.2f}ms {batched * 1000:>8.2f}ms "
+            f"{separate / batched:>7.2f}x"
+        )
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
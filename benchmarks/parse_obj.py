@@ -0,0 +1,84 @@
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pywavefront
+
+from obj_parser import parse_format, parse_obj
+
+ROOT = Path(__file__).parent.parent
+
+MODELS = [
+    ("resources/models/car.obj", "N3F_V3F"),
+    ("resources/models/bomb.obj", "T2F_N3F_V3F"),
+    ("resources/models/Minion.obj", "N3F_V3F"),
+]
+REPEATS = 5
+
+
+def write_default_material_model(path, size=200):
+    # Grid of quads, the first half before "usemtl foo" and the rest after it.
+    # pywavefront creates the default material of the first half before "foo".
+    rows = []
+    for y in range(size + 1):
+        for x in range(size + 1):
+            rows.append(f"v {x} {y} {(x * y) % 7}\n")
+    rows.append("vn 0 0 1\n")
+    for y in range(size):
+        if y == size // 2:
+            rows.append("usemtl foo\n")
+        for x in range(size):
+            a = y * (size + 1) + x + 1
+            b, c, d = a + 1, a + size + 2, a + size + 1
+            rows.append(f"f {a}//1 {b}//1 {c}//1 {d}//1\n")
+    Path(path).write_text("".join(rows))
+
+
+def load_pywavefront(path, layout):
+    scene = pywavefront.Wavefront(path, collect_faces=True, create_materials=True)
+    vertices = np.concatenate(
+        [np.array(m.vertices, dtype=np.float32) for m in scene.materials.values()]
+    )
+    return vertices, list(scene.materials)
+
+
+def load_numpy(path, layout):
+    vertices, records = parse_obj(path, layout)
+    return vertices, [record["name"] for record in records]
+
+
+def best_time(loader, path, layout):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = loader(path, layout)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def compare(models):
+    print(f"{'model':<14} {'pywavefront':>12} {'numpy':>10} {'speedup':>8}  identical")
+    for path, format in models:
+        layout = parse_format(format)
+        reference_time, reference = best_time(load_pywavefront, path, layout)
+        numpy_time, result = best_time(load_numpy, path, layout)
+        identical = (
+            reference[0].tobytes() == result[0].tobytes() and reference[1] == result[1]
+        )
+        print(
+            f"{path.stem:<14} {reference_time * 1000:>10.1f}ms "
+            f"{numpy_time * 1000:>8.1f}ms {reference_time / numpy_time:>7.1f}x  {identical}"
+        )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        default_first = Path(directory) / "default_first.obj"
+        write_default_material_model(default_first)
+        models = [(ROOT / path, format) for path, format in MODELS]
+        compare(models + [(default_first, "N3F_V3F")])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from loader import Mesh
+
+# Grid rows written to the synthetic OBJ at once
+ROWS_PER_WRITE = 64
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    chunk_bytes = args.chunk_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "grid.obj"
+        start = time.perf_counter()
+        triangles = write_grid(path, args.triangles)
+        print(
+            f"Wrote {triangles:,} triangles ({path.stat().st_size / 2**20:.0f} MiB) "
+            f"in {time.perf_counter() - start:.1f} s"
+        )
+
+        # NumPy reports its allocations to tracemalloc, the memory-mapped
+        # vertices are backed by the file and not counted
+        tracemalloc.start()
+        start = time.perf_counter()
+        mesh = Mesh(path, "N3F_V3F", chunk_bytes=chunk_bytes)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        vertex_count = len(mesh.vertices) // mesh.floats_per_vertex
+        if vertex_count != triangles * 3:
+            print(f"Expected {triangles * 3} vertices, got {vertex_count}")
+            sys.exit(1)
+        del mesh
+
+    # ru_maxrss is in KiB on Linux, it includes pages of the mapped files
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Streamed in {seconds:.1f} s with {args.chunk_mb} MiB chunks")
+    print(f"Peak allocations {peak / 2**20:.0f} MiB, max RSS {max_rss:.0f} MiB")
+
+    if peak > args.ceiling_mb * 2**20:
+        print(f"Peak allocations above the ceiling of {args.ceiling_mb} MiB")
+        sys.exit(1)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Check that streaming a large OBJ stays below a memory ceiling"
+    )
+    parser.add_argument("--triangles", type=int, default=10_000_000)
+    parser.add_argument("--chunk-mb", type=int, default=2)
+    parser.add_argument(
+        "--ceiling-mb", type=int, default=192, help="limit for the peak allocations"
+    )
+    return parser.parse_args(argv)
+
+
+def write_grid(path, n_triangles):
+    # Square grid of quads split into two triangles, alternating between two
+    # materials every row. Returns the number of triangles.
+    side = max(1, int(np.sqrt(n_triangles / 2)))
+    x, z = np.meshgrid(np.arange(side + 1), np.arange(side + 1))
+    with open(path, "w") as fh:
+        fh.write("vn 0 1 0\n")
+        for first in range(0, side + 1, ROWS_PER_WRITE):
+            rows = slice(first, first + ROWS_PER_WRITE)
+            positions = np.stack(
+                [x[rows].ravel(), np.zeros(x[rows].size), z[rows].ravel()], axis=1
+            )
+            np.savetxt(fh, positions / side, fmt="v %.6f %.6f %.6f")
+
+        columns = np.arange(side)
+        for row in range(side):
+            fh.write(f"usemtl material{row % 2}\n")
+            a = row * (side + 1) + columns + 1
+            b, c, d = a + 1, a + side + 1, a + side + 2
+            faces = np.stack([a, c, b, b, c, d], axis=1).reshape(-1, 3)
+            np.savetxt(fh, faces, fmt="f %d//1 %d//1 %d//1")
+
+    return 2 * side * side
+
+
+if __name__ == "__main__":
+    main()
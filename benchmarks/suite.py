@@ -0,0 +1,293 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+from config import Config
+from headless import select_platform
+
+ROOT = Path(__file__).parent.parent
+
+MODELS = [
+    ("resources/models/car.obj", "N3F_V3F"),
+    ("resources/models/bomb.obj", "T2F_N3F_V3F"),
+    ("resources/models/Minion.obj", "N3F_V3F"),
+]
+# (subdivision, instance grid side), 0 renders the model without instancing
+RENDER_CASES = [(1, 0), (3, 0), (1, 4), (3, 4)]
+RENDER_TIME = 1.0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.results is not None:
+        with open(args.results) as fh:
+            results = json.load(fh)
+    else:
+        select_platform(args.platform)
+        results = run(args)
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline is None:
+        print_metrics(results["metrics"])
+        return
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    regressions = compare(baseline["metrics"], results["metrics"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.threshold:.0%}")
+        sys.exit(1)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark model loading, upload, rendering and reset"
+    )
+    parser.add_argument("--output", default="benchmark.json", help="results file")
+    parser.add_argument("--baseline", default=None, help="results to compare against")
+    parser.add_argument(
+        "--results", default=None, help="compare these results instead of running"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="relative change that counts"
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--size", type=int, nargs=2, default=(640, 360))
+    parser.add_argument("--platform", choices=["egl", "osmesa"], default="egl")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    from OpenGL.GL import GL_RENDERER, GL_VERSION, glGetString
+
+    from offscreen import create_context
+
+    metrics = {}
+    bench_parse(metrics, args.repeats)
+
+    context = create_context(args.platform, (3, 3))
+    # glGetString returns None without a current context
+    renderer = (glGetString(GL_RENDERER) or b"").decode()
+    version = (glGetString(GL_VERSION) or b"").decode()
+    try:
+        bench_upload(metrics, args.repeats)
+    finally:
+        context.close()
+
+    config = Config.from_file()
+    config = replace(config, window=replace(config.window, size=tuple(args.size)))
+    bench_render(metrics, config, args)
+    bench_reset(metrics, config, args)
+
+    return {
+        "system": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "renderer": renderer,
+            "gl_version": version,
+            "platform": args.platform,
+        },
+        "settings": {
+            "repeats": args.repeats,
+            "frames": args.frames,
+            "size": list(args.size),
+        },
+        "metrics": metrics,
+    }
+
+
+def bench_parse(metrics, repeats):
+    from loader import Mesh
+
+    for path, format in MODELS:
+        name = Path(path).stem
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            Mesh(ROOT / path, format)
+            timings.append(time.perf_counter() - start)
+
+        # NumPy reports its allocations to tracemalloc
+        tracemalloc.start()
+        Mesh(ROOT / path, format)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        add_metric(metrics, f"parse/{name}/time", min(timings) * 1000, "ms")
+        add_metric(metrics, f"parse/{name}/peak_memory", peak / 2**20, "MiB")
+
+
+def bench_upload(metrics, repeats):
+    # Float vertices and the compact indexed layout, uploaded by ObjectLoader
+    # with its vertex array and material buffers
+    from OpenGL.GL import glFinish
+
+    from loader import Mesh, ObjectLoader
+
+    for path, format in MODELS:
+        for compact in (False, True):
+            name = Path(path).stem + ("/compact" if compact else "")
+            mesh = Mesh(ROOT / path, format, compact=compact)
+
+            timings = []
+            for _ in range(repeats):
+                glFinish()
+                start = time.perf_counter()
+                model = ObjectLoader(mesh)
+                glFinish()
+                timings.append(time.perf_counter() - start)
+                model.close()
+
+            seconds = min(timings)
+            add_metric(metrics, f"upload/{name}/time", seconds * 1000, "ms")
+            add_metric(
+                metrics,
+                f"upload/{name}/throughput",
+                mesh.nbytes / 2**20 / seconds,
+                "MiB/s",
+                higher_is_better=True,
+            )
+            add_metric(
+                metrics,
+                f"upload/{name}/bytes_per_triangle",
+                model.bytes_per_triangle,
+                "B",
+            )
+
+
+def bench_render(metrics, config, args):
+    from OpenGL.GL import glFinish
+
+    for subdivision, grid in RENDER_CASES:
+        case = replace(
+            config,
+            rendering=replace(config.rendering, subdivision=subdivision),
+            scene=replace(
+                config.scene, instanced=grid > 0, grid=(grid, 1, grid), instances=[]
+            ),
+        )
+        window = open_window(case, args)
+        try:
+            window._time = RENDER_TIME
+            window._update()
+            glFinish()
+
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                window._update()
+            glFinish()
+            seconds = (time.perf_counter() - start) / args.frames
+
+            instances = 1 if window._instances is None else window._instances.count
+            model = window._model
+            triangles = 0 if model is None else model.vertex_count // 3 * instances
+        finally:
+            window.close()
+
+        name = f"render/subdivision_{subdivision}/instances_{instances}"
+        add_metric(metrics, f"{name}/frame_time", seconds * 1000, "ms")
+        add_metric(metrics, f"{name}/fps", 1 / seconds, "fps", higher_is_better=True)
+        add_metric(
+            metrics,
+            f"{name}/triangles",
+            triangles / seconds / 1e6,
+            "Mtri/s",
+            higher_is_better=True,
+        )
+
+
+def bench_reset(metrics, config, args):
+    # From pressing Reset until the first frame with the new parameters is done.
+    # The falloff radius alternates so that baking has to run every time.
+    from OpenGL.GL import glFinish
+
+    for bake in (False, True):
+        case = replace(config, rendering=replace(config.rendering, bake_explosion=bake))
+        window = open_window(case, args)
+        try:
+            radius = window._falloff_radius
+            timings = []
+            for i in range(args.repeats + 1):
+                window._new_falloff_radius = radius * (1.0 + 0.01 * (i % 2))
+                glFinish()
+                start = time.perf_counter()
+                window._reset_simulation()
+                window._update()
+                glFinish()
+                timings.append(time.perf_counter() - start)
+        finally:
+            window.close()
+
+        name = "reset/baked" if bake else "reset/live"
+        add_metric(metrics, name, statistics.median(timings[1:]) * 1000, "ms")
+
+
+def open_window(config, args):
+    from offscreen import OffscreenWindow
+
+    window = OffscreenWindow(config, 42.0, args.platform, samples=1)
+    window._framebuffer.bind()
+    return window
+
+
+def add_metric(metrics, name, value, unit, higher_is_better=False):
+    metrics[name] = {
+        "value": float(value),
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Returns the names of metrics that got worse by more than threshold
+    regressions = []
+    print(f"{'metric':<48} {'baseline':>16} {'current':>16} {'change':>8}")
+    for name, metric in current.items():
+        if name not in baseline:
+            print(f"{name:<48} {'-':>16} {_format(metric):>16}")
+            continue
+
+        before = baseline[name]["value"]
+        change = (metric["value"] - before) / before if before else 0.0
+        worse = -change if metric["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif worse < -threshold:
+            flag = "  improved"
+        print(
+            f"{name:<48} {_format(baseline[name]):>16} {_format(metric):>16} "
+            f"{change:>+8.1%}{flag}"
+        )
+
+    for name in baseline.keys() - current.keys():
+        print(f"{name:<48} {_format(baseline[name]):>16} {'-':>16}")
+
+    return regressions
+
+
+def print_metrics(metrics):
+    for name, metric in metrics.items():
+        print(f"{name:<48} {_format(metric):>16}")
+
+
+def _format(metric):
+    return f"{metric['value']:.2f} {metric['unit']}"
+
+
+if __name__ == "__main__":
+    main()
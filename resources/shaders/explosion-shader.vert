@@ -0,0 +1,151 @@
+#version 330 core
+
+layout(location = 3) in int in_material;
+
+#ifdef BAKED_EXPLOSION
+layout(location = 10) in vec3 in_explosion_offset;
+layout(location = 11) in vec3 in_face_normal;
+#endif
+
+#ifdef INSTANCED
+layout(location = 4) in mat4 instance_matrix;
+layout(location = 8) in vec4 instance_explosion;
+layout(location = 9) in float instance_start_time;
+#endif
+
+layout(std140) uniform Camera {
+    mat4 projection_matrix;
+    mat4 view_matrix;
+    vec3 camera_position;
+};
+
+layout(std140) uniform Simulation {
+    vec3 explosion_origin;
+    float time;
+    float magnitude;
+    float falloff_radius;
+    float falloff_strength;
+    float impulse_decay;
+    float random_strength;
+    float gravity_power;
+    float seed;
+};
+
+uniform mat4 model_matrix;
+uniform int should_explode;
+
+// Interleaved vertex buffer of the mesh, every vertex reads its whole triangle
+uniform samplerBuffer mesh_vertices;
+uniform int floats_per_vertex;
+uniform int position_offset;
+
+out frag_data {
+    vec3 position;
+    vec3 normal;
+    flat int material;
+} frag;
+
+vec3 corners[3];
+vec3 triangle_origin;
+float triangle_time;
+float triangle_seed;
+
+highp float rand(vec2 co)
+{
+    highp float a = 12.9898;
+    highp float b = 78.233;
+    highp float c = 43758.5453;
+    highp float dt = dot(co.xy, vec2(a, b));
+    highp float sn = mod(dt, 3.14);
+    return fract(sin(sn) * c);
+}
+
+float falloff(float len) {
+    return pow(clamp(1.0 - len / falloff_radius, 0.0, 1.0), falloff_strength);
+}
+
+float impulse() {
+    return pow(triangle_time, impulse_decay) * magnitude;
+}
+
+vec3 randomise_vec(vec3 direction) {
+    vec3 rand_dir = normalize(vec3(
+                rand(corners[0].xy * triangle_seed),
+                rand(corners[1].yz * triangle_seed),
+                rand(corners[2].zx * triangle_seed)
+            ));
+    if (isnan(rand_dir) != bvec3(false, false, false))
+        return vec3(0);
+    return normalize(direction + rand_dir * random_strength);
+}
+
+vec3 surface_normal() {
+    vec3 a = corners[0] - corners[1];
+    vec3 b = corners[2] - corners[1];
+    return -normalize(cross(a, b));
+}
+
+vec3 surface_center() {
+    return (corners[0] + corners[1] + corners[2]) / 3;
+}
+
+vec3 gravity() {
+    return vec3(0, -1, 0) * gravity_power * triangle_time * triangle_time;
+}
+
+vec3 explode(vec3 pos) {
+#ifdef BAKED_EXPLOSION
+    return pos + in_explosion_offset * impulse() + gravity();
+#else
+    vec3 dir = surface_center() - triangle_origin;
+    float dist = length(dir);
+    dir = normalize(dir);
+
+    return pos + randomise_vec(dir) * impulse() * falloff(dist) + gravity();
+#endif
+}
+
+vec3 corner(int index) {
+    int offset = index * floats_per_vertex + position_offset;
+    return vec3(
+        texelFetch(mesh_vertices, offset).r,
+        texelFetch(mesh_vertices, offset + 1).r,
+        texelFetch(mesh_vertices, offset + 2).r
+    );
+}
+
+void main()
+{
+#ifdef INSTANCED
+    mat4 world_matrix = instance_matrix * model_matrix;
+    triangle_origin = (instance_matrix * vec4(explosion_origin, 1.0)).xyz
+            + instance_explosion.xyz;
+    triangle_time = max(time - instance_start_time, 0.0);
+    triangle_seed = instance_explosion.w;
+#else
+    mat4 world_matrix = model_matrix;
+    triangle_origin = explosion_origin;
+    triangle_time = time;
+    triangle_seed = seed;
+#endif
+
+    // Meshes are drawn as separate triangles, so gl_VertexID / 3 is the triangle
+    int first = gl_VertexID / 3 * 3;
+    for (int i = 0; i < 3; i++)
+        corners[i] = (world_matrix * vec4(corner(first + i), 1.0)).xyz;
+
+    vec3 pos = corners[gl_VertexID - first];
+    vec3 normal = surface_normal();
+    if (should_explode == 1) {
+        pos = explode(pos);
+#ifdef BAKED_EXPLOSION
+        normal = in_face_normal;
+#endif
+    }
+
+    frag.position = pos;
+    frag.normal = normal;
+    frag.material = in_material;
+
+    gl_Position = projection_matrix * view_matrix * vec4(pos, 1.0);
+}
@@ -3,6 +3,7 @@
 in frag_data {
     vec3 position;
     vec3 normal;
+    flat int material;
 } frag;
 
 out vec4 f_color;
@@ -14,8 +15,19 @@ struct Material {
     float shininess;
 };
 
-uniform vec3 camera_position;
+layout(std140) uniform Camera {
+    mat4 projection_matrix;
+    mat4 view_matrix;
+    vec3 camera_position;
+};
+
+#ifdef BATCH_MATERIALS
+layout(std140) uniform Materials {
+    Material materials[MAX_MATERIALS];
+};
+#else
 uniform Material material;
+#endif
 
 struct Light {
     vec3 position;
@@ -33,6 +45,10 @@ Light light = Light(
 
 void main()
 {
+#ifdef BATCH_MATERIALS
+    Material material = materials[frag.material];
+#endif
+
     vec3 ambient = light.ambient * material.ambient;
 
     vec3 N = normalize(frag.normal);
@@ -0,0 +1,26 @@
+#version 330 core
+
+layout(location = 0) in vec3 in_position;
+layout(location = 1) in vec3 in_normal;
+layout(location = 3) in int in_material;
+
+layout(std140) uniform Camera {
+    mat4 projection_matrix;
+    mat4 view_matrix;
+    vec3 camera_position;
+};
+
+out frag_data {
+    vec3 position;
+    vec3 normal;
+    flat int material;
+} frag;
+
+void main()
+{
+    frag.position = in_position;
+    frag.normal = in_normal;
+    frag.material = in_material;
+
+    gl_Position = projection_matrix * view_matrix * vec4(in_position, 1.0);
+}
@@ -3,22 +3,87 @@
 layout(location = 0) in vec3 in_position;
 layout(location = 1) in vec3 in_normal;
 layout(location = 2) in vec3 in_tex;
+layout(location = 3) in int in_material;
+
+#ifdef BAKED_EXPLOSION
+layout(location = 10) in vec3 in_explosion_offset;
+layout(location = 11) in vec3 in_face_normal;
+#endif
+
+#ifdef INSTANCED
+layout(location = 4) in mat4 instance_matrix;
+layout(location = 8) in vec4 instance_explosion;
+layout(location = 9) in float instance_start_time;
+#endif
+
+layout(std140) uniform Camera {
+    mat4 projection_matrix;
+    mat4 view_matrix;
+    vec3 camera_position;
+};
+
+layout(std140) uniform Simulation {
+    vec3 explosion_origin;
+    float time;
+    float magnitude;
+    float falloff_radius;
+    float falloff_strength;
+    float impulse_decay;
+    float random_strength;
+    float gravity_power;
+    float seed;
+};
 
-uniform mat4 projection_matrix;
-uniform mat4 view_matrix;
 uniform mat4 model_matrix;
 
+#ifdef COMPACT_VERTICES
+// Positions are normalized to the bounding box of the mesh
+uniform vec3 position_scale;
+uniform vec3 position_bias;
+#endif
+
 out vertex_data {
    vec3 position;
    vec3 normal;
+   flat int material;
+   flat vec3 explosion_origin;
+   flat float time;
+   flat float seed;
+#ifdef BAKED_EXPLOSION
+   flat vec3 explosion_offset;
+   flat vec3 face_normal;
+#endif
 } vertex;
 
 void main()
 {
-   vec4 worldPos = model_matrix * vec4(in_position, 1.0);
+#ifdef INSTANCED
+   mat4 world_matrix = instance_matrix * model_matrix;
+   vertex.explosion_origin = (instance_matrix * vec4(explosion_origin, 1.0)).xyz
+         + instance_explosion.xyz;
+   vertex.time = max(time - instance_start_time, 0.0);
+   vertex.seed = instance_explosion.w;
+#else
+   mat4 world_matrix = model_matrix;
+   vertex.explosion_origin = explosion_origin;
+   vertex.time = time;
+   vertex.seed = seed;
+#endif
+
+#ifdef COMPACT_VERTICES
+   vec3 position = position_bias + position_scale * in_position;
+#else
+   vec3 position = in_position;
+#endif
+   vec4 worldPos = world_matrix * vec4(position, 1.0);
 
    vertex.position = worldPos.xyz;
-   vertex.normal = mat3(transpose(inverse(model_matrix))) * in_normal;
+   vertex.normal = mat3(transpose(inverse(world_matrix))) * in_normal;
+   vertex.material = in_material;
+#ifdef BAKED_EXPLOSION
+   vertex.explosion_offset = in_explosion_offset;
+   vertex.face_normal = in_face_normal;
+#endif
 
    gl_Position = projection_matrix * view_matrix * worldPos;
 }
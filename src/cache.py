@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import re
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from obj_parser import read_chunks
+
+# Bumped whenever the parser output or the stored arrays change
+CACHE_VERSION = 3
+# Models are hashed in blocks so that large files are never read at once
+_HASH_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+class MeshCache:
+    def __init__(self, directory):
+        self._directory = Path(directory)
+
+    def key(self, filepath, format):
+        filepath = Path(filepath)
+
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_VERSION}:{format}".encode())
+        mtllibs = []
+        for chunk in read_chunks(filepath, _HASH_CHUNK_BYTES):
+            digest.update(chunk)
+            mtllibs += material_libraries(chunk)
+        for mtllib in mtllibs:
+            path = filepath.parent / mtllib
+            digest.update(mtllib.encode())
+            if path.exists():
+                digest.update(path.read_bytes())
+
+        return digest.hexdigest()
+
+    def load(self, key):
+        vertices_path, materials_path = self._paths(key)
+        if not materials_path.exists():
+            return None
+
+        try:
+            with open(materials_path, "r") as fh:
+                records = json.load(fh)
+            vertices = np.load(vertices_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        return vertices, records
+
+    def store(self, key, vertices, records):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        vertices_path, materials_path = self._paths(key)
+
+        # The materials file marks a complete entry, so it is written last
+        tmp_path = vertices_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, np.ascontiguousarray(vertices, dtype=np.float32))
+        os.replace(tmp_path, vertices_path)
+        self._store_records(materials_path, records)
+
+    def stream(self, key, write):
+        # Entry whose vertices write(file) -> (vertices, records) puts straight
+        # into the file as .npy data, for models too large to hold in memory
+        self._directory.mkdir(parents=True, exist_ok=True)
+        vertices_path, materials_path = self._paths(key)
+
+        tmp_path = vertices_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w+b") as fh:
+                vertices, records = write(fh)
+        except BaseException:
+            # Failed or cancelled parses leave no partial file behind
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, vertices_path)
+        self._store_records(materials_path, records)
+
+        return vertices, records
+
+    def load_grid(self, key):
+        # Arrays of a TriangleGrid stored next to the entry, or None
+        try:
+            with np.load(self._grid_path(key)) as arrays:
+                return {name: arrays[name] for name in arrays.files}
+        except (OSError, ValueError):
+            return None
+
+    def store_grid(self, key, arrays):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._grid_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp_path, path)
+
+    def _store_records(self, materials_path, records):
+        tmp_path = materials_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as fh:
+            json.dump(records, fh)
+        os.replace(tmp_path, materials_path)
+
+    def _paths(self, key):
+        return (
+            self._directory / f"{key}.npy",
+            self._directory / f"{key}.json",
+        )
+
+    def _grid_path(self, key):
+        return self._directory / f"{key}.grid.npz"
+
+
+class ProgramCache:
+    # Linked program binaries, keyed by the preprocessed sources and the driver
+    # (vendor, renderer and version string) since binaries only load on the
+    # driver that produced them
+    def __init__(self, directory, driver):
+        self._directory = Path(directory)
+        self._driver = driver
+
+    def key(self, sources, feedback_varyings=None):
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_VERSION}:{self._driver}".encode())
+        for source, shader_type in sources:
+            digest.update(f"{int(shader_type)}:{len(source)}:".encode())
+            digest.update(source.encode())
+        digest.update(repr(feedback_varyings).encode())
+        return digest.hexdigest()
+
+    def load(self, key):
+        # (binary format, data) or None
+        try:
+            data = self._path(key).read_bytes()
+        except OSError:
+            return None
+        if len(data) < 4:
+            return None
+        (binary_format,) = struct.unpack("<I", data[:4])
+        return binary_format, data[4:]
+
+    def store(self, key, binary_format, data):
+        if not data:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as fh:
+            fh.write(struct.pack("<I", binary_format))
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    def _path(self, key):
+        return self._directory / f"{key}.bin"
+
+
+def material_libraries(data):
+    return [
+        match.decode().strip()
+        for match in re.findall(rb"^mtllib[ \t]+(.+)$", data, re.MULTILINE)
+    ]
@@ -1,7 +1,6 @@
 import math
 
 import glm
-from OpenGL.GL import *
 
 
 class Camera:
@@ -29,17 +28,20 @@ class Camera:
 
         self._first_mouse = True
 
-    def upload_uniforms(self, program):
-        view = self._view_matrix()
-        proj = self._proj_matrix()
+    @property
+    def state(self):
+        return [*self._position, *self._front]
 
-        proj_loc = glGetUniformLocation(program, "projection_matrix")
-        view_loc = glGetUniformLocation(program, "view_matrix")
-        camera_loc = glGetUniformLocation(program, "camera_position")
+    def set_state(self, state):
+        self._position = glm.vec3(*state[0:3])
+        self._front = glm.vec3(*state[3:6])
+        self._first_mouse = True
 
-        glUniformMatrix4fv(view_loc, 1, GL_FALSE, glm.value_ptr(view))
-        glUniformMatrix4fv(proj_loc, 1, GL_FALSE, glm.value_ptr(proj))
-        glUniform3fv(camera_loc, 1, glm.value_ptr(self._position))
+    def upload_uniforms(self, uniforms):
+        uniforms.set("projection_matrix", self._proj_matrix())
+        uniforms.set("view_matrix", self._view_matrix())
+        uniforms.set("camera_position", self._position)
+        uniforms.upload()
 
     def move_forward(self, delta_time):
         self._position += self._front * self._speed * delta_time
@@ -79,6 +81,10 @@ class Camera:
         )
         self._front = glm.normalize(direction)
 
+    @property
+    def view_projection(self):
+        return self._proj_matrix() * self._view_matrix()
+
     def _view_matrix(self):
         return glm.lookAt(self._position, self._position + self._front, self._up)
 
@@ -0,0 +1,81 @@
+from OpenGL.GL import *
+
+from uniforms import STORAGE_BINDINGS
+
+# Geometry shader outputs recorded per vertex: position, normal and material
+FEEDBACK_VARYINGS = ["frag_data.position", "frag_data.normal", "frag_data.material"]
+STRIDE = 4 * (3 + 3 + 1)
+
+
+class ExplosionCapture:
+    def __init__(self, replay_shader):
+        self._shader = replay_shader
+        self._state = None
+        self._capacity = 0
+
+        self._vao = glGenVertexArrays(1)
+        self._vbo = glGenBuffers(1)
+
+        glBindVertexArray(self._vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, STRIDE, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, STRIDE, ctypes.c_void_p(12))
+        glEnableVertexAttribArray(1)
+        glVertexAttribIPointer(3, 1, GL_INT, STRIDE, ctypes.c_void_p(24))
+        glEnableVertexAttribArray(3)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def matches(self, state):
+        return self._state is not None and self._state == state
+
+    def record(self, state, vertex_count, draw):
+        # Captures the geometry shader output while `draw` renders as usual
+        self._reserve(vertex_count * STRIDE)
+
+        glBindBufferBase(GL_TRANSFORM_FEEDBACK_BUFFER, 0, self._vbo)
+        glBeginTransformFeedback(GL_TRIANGLES)
+        draw()
+        glEndTransformFeedback()
+        glBindBufferBase(GL_TRANSFORM_FEEDBACK_BUFFER, 0, 0)
+
+        self._state = state
+
+    def compute(self, state, vertex_count, dispatch):
+        # Lets a compute shader write the exploded vertices instead
+        self._reserve(vertex_count * STRIDE)
+
+        glBindBufferBase(
+            GL_SHADER_STORAGE_BUFFER, STORAGE_BINDINGS["Exploded"], self._vbo
+        )
+        dispatch()
+        glMemoryBarrier(GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
+
+        self._state = state
+
+    def replay(self, model, repeat=1):
+        glUseProgram(self._shader.program)
+        model.replay(self._shader, self._vao, repeat)
+
+    def invalidate(self):
+        self._state = None
+
+    def close(self):
+        if self._vbo is not None:
+            glDeleteBuffers(1, [self._vbo])
+
+        if self._vao is not None:
+            glDeleteVertexArrays(1, [self._vao])
+
+        self._vao = None
+        self._vbo = None
+
+    def _reserve(self, nbytes):
+        if nbytes <= self._capacity:
+            return
+
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glBufferData(GL_ARRAY_BUFFER, nbytes, None, GL_DYNAMIC_COPY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self._capacity = nbytes
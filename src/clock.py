@@ -0,0 +1,53 @@
+import math
+
+CLOCK_MODES = ("variable", "fixed", "lockstep")
+
+
+class SimulationClock:
+    # variable: advances by the measured frame time
+    # fixed: advances in whole steps taken from the measured frame time
+    # lockstep: advances exactly one step per frame, independent of frame time
+    def __init__(self, mode, step, max_delta, interpolate):
+        if mode not in CLOCK_MODES:
+            raise ValueError(f"Unknown clock mode: {mode}")
+
+        self._mode = mode
+        self._step = step
+        self._max_delta = max_delta
+        self._interpolate = interpolate
+        self.reset()
+
+    @property
+    def time(self):
+        if self._mode == "fixed" and self._interpolate:
+            # Between the last two steps, by the fraction of a step left over.
+            # The rendered time lags up to one step behind but never leaves
+            # the range the fixed steps have simulated.
+            fraction = abs(self._accumulator) / self._step
+            return self._previous + (self._time - self._previous) * fraction
+        return self._time
+
+    def reset(self):
+        self._time = 0.0
+        self._previous = 0.0
+        self._accumulator = 0.0
+
+    def advance(self, delta, multiplier=1.0):
+        if self._mode == "lockstep":
+            delta = self._step
+        else:
+            # A hitch advances the simulation by at most max_delta
+            delta = max(-self._max_delta, min(delta, self._max_delta))
+        delta *= multiplier
+
+        if self._mode == "fixed":
+            self._accumulator += delta
+            steps = int(self._accumulator / self._step)
+            self._accumulator -= steps * self._step
+            delta = steps * self._step
+            if steps:
+                last = math.copysign(self._step, delta)
+                self._previous = max(0.0, self._time + delta - last)
+
+        self._time = max(0.0, self._time + delta)
+        return self.time
@@ -0,0 +1,94 @@
+import numpy as np
+from OpenGL.GL import (
+    GL_HALF_FLOAT,
+    GL_INT_2_10_10_10_REV,
+    GL_UNSIGNED_INT,
+    GL_UNSIGNED_SHORT,
+)
+
+# Compact layout of a vertex, in this order (attribute locations 0, 1, 2):
+#   position  4 x uint16, normalized to the AABB of the mesh. The fourth
+#             component holds the index of the material within its batch.
+#   normal    GL_INT_2_10_10_10_REV, signed normalized (N formats)
+#   tex       2 x float16 (T formats)
+# Vertices are deduplicated after quantization and drawn through an index
+# buffer, so the corners of every triangle reach the geometry shader as before.
+MATERIAL_OFFSET = 6
+_POSITION_LEVELS = 65535
+_NORMAL_LEVELS = 511
+
+
+class CompactVertices:
+    def __init__(self, vertices, format, floats_per_vertex, material_ranges):
+        vertices = vertices.reshape(-1, floats_per_vertex)
+        columns = {name: (offset, n) for name, n, offset in format}
+
+        offset, _ = columns["V"]
+        positions = vertices[:, offset : offset + 3]
+        minimum = positions.min(axis=0) if len(positions) else np.zeros(3)
+        extent = (positions.max(axis=0) - minimum) if len(positions) else np.ones(3)
+        self.position_bias = minimum.astype(np.float32)
+        self.position_scale = extent.astype(np.float32)
+
+        packed = np.zeros((len(vertices), 4), dtype=np.uint16)
+        scale = np.where(extent > 0, extent, 1.0)
+        packed[:, :3] = np.rint((positions - minimum) / scale * _POSITION_LEVELS)
+        counts = [count for _, count in material_ranges]
+        batch_index = np.arange(len(counts)) % 256
+        packed[:, 3] = np.repeat(batch_index, counts)
+        parts = [packed.view(np.uint8)]
+        # (location, size, type, normalized, offset)
+        self.attributes = [(0, 3, GL_UNSIGNED_SHORT, True, 0)]
+        stride = 8
+
+        if "N" in columns:
+            offset, _ = columns["N"]
+            parts.append(_pack_normals(vertices[:, offset : offset + 3]))
+            self.attributes.append((1, 4, GL_INT_2_10_10_10_REV, True, stride))
+            stride += 4
+
+        if "T" in columns:
+            offset, n = columns["T"]
+            tex = vertices[:, offset : offset + n].astype(np.float16)
+            parts.append(tex.view(np.uint8).reshape(len(vertices), -1))
+            self.attributes.append((2, n, GL_HALF_FLOAT, False, stride))
+            stride += 2 * n
+        self.stride = stride
+
+        # Unique vertices in order of first use, which keeps the index buffer
+        # friendly to the post-transform cache
+        rows = np.ascontiguousarray(np.hstack(parts)).view(f"V{stride}").ravel()
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        remap = np.empty_like(order)
+        remap[order] = np.arange(len(order))
+        unique = rows[first[order]]
+        indices = remap[inverse.ravel()]
+
+        self.vertex_count = len(unique)
+        self.index_count = len(indices)
+        if self.vertex_count <= np.iinfo(np.uint16).max:
+            self.index_type = GL_UNSIGNED_SHORT
+            indices = indices.astype(np.uint16)
+        else:
+            self.index_type = GL_UNSIGNED_INT
+            indices = indices.astype(np.uint32)
+        self.index_size = indices.itemsize
+
+        # Vertices and indices share one buffer, the indices start at a
+        # multiple of 4 since every stride is one
+        vertex_bytes = unique.view(np.uint8)
+        self.index_offset = len(vertex_bytes)
+        self.data = np.concatenate((vertex_bytes, indices.view(np.uint8)))
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+def _pack_normals(normals):
+    # x, y and z as 10 bit two's complement, w stays 0
+    quantized = np.rint(np.clip(normals, -1.0, 1.0) * _NORMAL_LEVELS).astype(np.int32)
+    quantized &= 0x3FF
+    packed = quantized[:, 0] | (quantized[:, 1] << 10) | (quantized[:, 2] << 20)
+    return packed.astype(np.uint32).view(np.uint8).reshape(-1, 4)
@@ -9,6 +9,7 @@ class WindowConfig:
     title: str
     size: tuple[int, int]
     fps: int
+    samples: int
 
 
 @dataclass(frozen=True)
@@ -16,6 +17,24 @@ class ShadersConfig:
     vertex: str
     geometry: str
     fragment: str
+    replay: str
+    explosion_stage: str
+    vertex_explosion: str
+    compute_explosion: str
+    hot_reload: bool
+
+
+@dataclass(frozen=True)
+class RenderingConfig:
+    batch_materials: bool
+    capture_explosion: bool
+    bake_explosion: bool
+    subdivision: int
+    lod_distance: float
+    culling: bool
+    cluster_triangles: int
+    compact_vertices: bool
+    partition_explosion: bool
 
 
 @dataclass(frozen=True)
@@ -24,6 +43,16 @@ class ModelsConfig:
     car_format: str
     indicator: str
     indicator_format: str
+    stream_chunk_mb: int
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool
+    directory: str
+    program_directory: str
+    gpu_budget_mb: int
+    upload_chunk_mb: int
 
 
 @dataclass(frozen=True)
@@ -46,13 +75,64 @@ class SimulationConfig:
     gravity_power: float
 
 
+@dataclass(frozen=True)
+class ClockConfig:
+    mode: str
+    step: float
+    max_delta: float
+    interpolate: bool
+    record: str
+    replay: str
+
+
+@dataclass(frozen=True)
+class PacingConfig:
+    mode: str
+    governor: bool
+    budget_ms: float
+    min_scale: float
+
+
+@dataclass(frozen=True)
+class InstanceConfig:
+    position: tuple[float, float, float]
+    rotation: float = 0.0
+    scale: float = 1.0
+    origin_offset: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    seed: float | None = None
+    start_time: float = 0.0
+
+
+@dataclass(frozen=True)
+class SceneConfig:
+    instanced: bool
+    grid: tuple[int, int, int]
+    spacing: tuple[float, float, float]
+    start_time_spread: float
+    instances: list[InstanceConfig]
+
+
+@dataclass(frozen=True)
+class DebugConfig:
+    count_gl_calls: bool
+    profile: bool
+    profile_history: int
+    profile_trace: str
+
+
 @dataclass(frozen=True)
 class Config:
     window: WindowConfig
     shaders: ShadersConfig
+    rendering: RenderingConfig
     models: ModelsConfig
+    cache: CacheConfig
     camera: CameraConfig
     simulation: SimulationConfig
+    clock: ClockConfig
+    pacing: PacingConfig
+    scene: SceneConfig
+    debug: DebugConfig
 
     @classmethod
     def from_file(cls, path: Path | None = None) -> Self:
@@ -65,7 +145,21 @@ class Config:
         return cls(
             window=WindowConfig(**data["window"]),
             shaders=ShadersConfig(**data["shaders"]),
+            rendering=RenderingConfig(**data["rendering"]),
             models=ModelsConfig(**data["models"]),
+            cache=CacheConfig(**data["cache"]),
             camera=CameraConfig(**data["camera"]),
             simulation=SimulationConfig(**data["simulation"]),
+            clock=ClockConfig(**data["clock"]),
+            pacing=PacingConfig(**data["pacing"]),
+            scene=SceneConfig(
+                **{
+                    **data["scene"],
+                    "instances": [
+                        InstanceConfig(**instance)
+                        for instance in data["scene"].get("instances", [])
+                    ],
+                }
+            ),
+            debug=DebugConfig(**data["debug"]),
         )
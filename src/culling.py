@@ -0,0 +1,101 @@
+import numpy as np
+
+from explosion import falloff, gravity, impulse
+
+# Clusters are runs of consecutive triangles within one material. OBJ files
+# list neighbouring faces together, so a run stays spatially compact.
+
+
+class ClusterBounds:
+    def __init__(self, positions, ranges, cluster_triangles):
+        # positions: (n_vertices, 3) in model space, ranges: (start, count)
+        # vertex ranges of the materials in draw order
+        self.size = cluster_triangles
+        firsts, counts = [], []
+        cluster_vertices = cluster_triangles * 3
+        for start, count in ranges:
+            starts = np.arange(start, start + count, cluster_vertices)
+            firsts.append(starts)
+            counts.append(np.minimum(cluster_vertices, start + count - starts))
+        self.firsts = np.concatenate(firsts).astype(np.int32)
+        self.counts = np.concatenate(counts).astype(np.int32)
+
+        # Sphere around the AABB center of each cluster
+        cluster = np.repeat(np.arange(len(self.firsts)), self.counts)
+        vertices = positions[np.repeat(self.firsts, self.counts) + _ranks(self.counts)]
+        minimum = np.minimum.reduceat(vertices, _offsets(self.counts))
+        maximum = np.maximum.reduceat(vertices, _offsets(self.counts))
+        self.centers = ((minimum + maximum) / 2).astype(np.float32)
+        distances = np.linalg.norm(vertices - self.centers[cluster], axis=1)
+        self.radii = np.maximum.reduceat(distances, _offsets(self.counts))
+
+    def __len__(self):
+        return len(self.firsts)
+
+    def visible(
+        self,
+        model,
+        view_projection,
+        time,
+        explosion_origin,
+        magnitude,
+        falloff_radius,
+        falloff_strength,
+        impulse_decay,
+        gravity_power,
+    ):
+        # Boolean mask of the clusters that can reach into the view frustum at
+        # `time`, for the simulation values as uploaded to the shader. Every
+        # triangle moves by the same gravity plus at most impulse * falloff
+        # along a unit vector, and falloff is largest at the point of the
+        # sphere closest to the explosion origin.
+        model = np.asarray(model, dtype=np.float32)
+        centers = self.centers @ model[:3, :3].T + model[:3, 3]
+        radii = self.radii * np.linalg.norm(model[:3, :3], axis=0).max()
+
+        closest = np.linalg.norm(centers - np.float32(explosion_origin), axis=1)
+        reach = np.abs(impulse(time, impulse_decay, magnitude)) * falloff(
+            np.maximum(closest - radii, 0.0), falloff_radius, falloff_strength
+        )
+        centers = centers + gravity(time, gravity_power)
+        radii = radii + reach
+
+        planes = frustum_planes(view_projection)
+        distances = centers @ planes[:, :3].T + planes[:, 3]
+        # NaN bounds (negative time) compare False and keep the cluster
+        return ~(distances < -radii[:, None]).any(axis=1)
+
+    def runs(self, visible, start, count):
+        # (firsts, counts) of the visible vertices in [start, start + count),
+        # adjacent clusters merged into one range
+        end = start + count
+        inside = visible & (self.firsts >= start) & (self.firsts < end)
+        firsts = self.firsts[inside]
+        counts = self.counts[inside]
+        if len(firsts) == 0:
+            return firsts, counts
+
+        breaks = np.flatnonzero(firsts[1:] != firsts[:-1] + counts[:-1]) + 1
+        run_starts = np.concatenate(([0], breaks))
+        run_firsts = firsts[run_starts]
+        run_counts = np.add.reduceat(counts, run_starts).astype(np.int32)
+        return run_firsts, run_counts
+
+
+def frustum_planes(view_projection):
+    # Left, right, bottom, top, near and far planes as (normal, distance) rows
+    # pointing inwards, from the rows of the clip space matrix
+    m = np.asarray(view_projection, dtype=np.float64)
+    planes = np.array(
+        [m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]]
+    )
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def _offsets(counts):
+    return np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+
+def _ranks(counts):
+    # 0..count-1 for every cluster, concatenated
+    return np.arange(counts.sum()) - np.repeat(_offsets(counts), counts)
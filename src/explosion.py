@@ -0,0 +1,161 @@
+import numpy as np
+
+# NumPy versions of the per-triangle functions in geometry-shader.geom. They are
+# evaluated in float32 like the shader, `positions` hold the world space corners
+# of each triangle with shape (n_triangles, 3, 3).
+
+_DOWN = np.array([0.0, -1.0, 0.0], dtype=np.float32)
+
+
+def rand(co):
+    dt = co[..., 0] * np.float32(12.9898) + co[..., 1] * np.float32(78.233)
+    sn = _mod(dt, np.float32(3.14))
+    return _fract(np.sin(sn) * np.float32(43758.5453))
+
+
+def falloff(length, falloff_radius, falloff_strength):
+    base = np.clip(1.0 - length / np.float32(falloff_radius), 0.0, 1.0)
+    return np.power(base, np.float32(falloff_strength))
+
+
+def impulse(time, impulse_decay, magnitude):
+    return np.power(np.float32(time), np.float32(impulse_decay)) * np.float32(magnitude)
+
+
+def gravity(time, gravity_power):
+    time = np.float32(time)
+    return _DOWN * np.float32(gravity_power) * time * time
+
+
+def randomise_vec(direction, positions, seed, random_strength):
+    seed = np.float32(seed)
+    rand_dir = _normalize(
+        np.stack(
+            [
+                rand(positions[:, 0, [0, 1]] * seed),
+                rand(positions[:, 1, [1, 2]] * seed),
+                rand(positions[:, 2, [2, 0]] * seed),
+            ],
+            axis=1,
+        )
+    )
+    randomised = _normalize(direction + rand_dir * np.float32(random_strength))
+    return np.where(np.isnan(rand_dir).any(axis=1)[:, None], 0.0, randomised)
+
+
+def surface_normal(positions):
+    a = positions[:, 0] - positions[:, 1]
+    b = positions[:, 2] - positions[:, 1]
+    return -_normalize(np.cross(a, b))
+
+
+def surface_center(positions):
+    return (positions[:, 0] + positions[:, 1] + positions[:, 2]) / np.float32(3)
+
+
+def explode(positions, directions, falloffs, impulse_scale, gravity_offset):
+    # directions and falloffs are randomise_vec(dir) and falloff(dist) per
+    # triangle, impulse_scale and gravity_offset are impulse() and gravity()
+    displacement = directions * impulse_scale * falloffs[:, None]
+    return positions + displacement[:, None, :] + gravity_offset
+
+
+def explosion_terms(
+    positions,
+    explosion_origin,
+    falloff_radius,
+    falloff_strength,
+    random_strength,
+    seed,
+):
+    # Everything explode() needs except the time dependent impulse and gravity
+    positions = np.asarray(positions, dtype=np.float32)
+    direction = surface_center(positions) - np.asarray(explosion_origin, np.float32)
+    distance = np.linalg.norm(direction, axis=1)
+    direction = _normalize(direction)
+
+    directions = randomise_vec(direction, positions, seed, random_strength)
+    falloffs = falloff(distance, falloff_radius, falloff_strength)
+    return directions, falloffs, surface_normal(positions)
+
+
+def bake_explosion(
+    positions,
+    explosion_origin,
+    falloff_radius,
+    falloff_strength,
+    random_strength,
+    seed,
+):
+    directions, falloffs, normals = explosion_terms(
+        positions,
+        explosion_origin,
+        falloff_radius,
+        falloff_strength,
+        random_strength,
+        seed,
+    )
+    offsets = directions * falloffs[:, None]
+    return offsets.astype(np.float32), normals.astype(np.float32)
+
+
+def explode_triangles(positions, simulation, seed, times):
+    # Exploded corners for every time with shape (n_times, n_triangles, 3, 3)
+    # and the face normals, which stay constant. `simulation` holds the values
+    # of SimulationConfig, converted the same way as the shader uniforms.
+    positions = np.asarray(positions, dtype=np.float32)
+    out = np.empty((len(times),) + positions.shape, dtype=np.float32)
+
+    for i, (_, corners) in enumerate(
+        explode_frames(positions, simulation, seed, times)
+    ):
+        out[i] = corners
+
+    return out, surface_normal(positions).astype(np.float32)
+
+
+def explode_frames(positions, simulation, seed, times):
+    # Yields (time, corners) one frame at a time, so long sequences only ever
+    # hold a single frame in memory
+    positions = np.asarray(positions, dtype=np.float32)
+    directions, falloffs, _ = explosion_terms(
+        positions,
+        simulation.explosion_origin,
+        simulation.falloff_radius,
+        simulation.falloff_strength,
+        simulation.random_strength,
+        seed,
+    )
+
+    impulse_decay = 1 - simulation.impulse_decay
+    for time in times:
+        yield (
+            time,
+            explode(
+                positions,
+                directions,
+                falloffs,
+                impulse(time, impulse_decay, simulation.magnitude),
+                gravity(time, simulation.gravity_power),
+            ),
+        )
+
+
+def mesh_triangles(mesh):
+    # Corners of a loader.Mesh, which stores separate triangles
+    vertices = np.asarray(mesh.vertices).reshape(-1, mesh.floats_per_vertex)
+    offset = next(offset for name, _, offset in mesh.format if name == "V")
+    return vertices[:, offset : offset + 3].reshape(-1, 3, 3).astype(np.float32)
+
+
+def _mod(x, y):
+    return x - y * np.floor(x / y)
+
+
+def _fract(x):
+    return x - np.floor(x)
+
+
+def _normalize(v):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return v / np.linalg.norm(v, axis=-1, keepdims=True)
@@ -0,0 +1,200 @@
+import argparse
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from cache import MeshCache
+from config import Config
+from explosion import explode_frames, mesh_triangles, surface_normal
+from loader import Mesh, ObjectLoader
+
+VERTEX_CACHE_MAGIC = b"EXPLCACH"
+VERTEX_CACHE_VERSION = 1
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "uint16": np.uint16}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = Config.from_file(args.config)
+    model = args.model or config.models.car
+    format = args.format or config.models.car_format
+    mesh_cache = None
+    if config.cache.enabled:
+        mesh_cache = MeshCache(config.cache.directory)
+    mesh = Mesh(model, format, mesh_cache)
+    materials = [ObjectLoader.Material.from_record(r) for r in mesh.records]
+
+    if args.times is not None:
+        times = args.times
+    else:
+        n_frames = int(round((args.end - args.start) * args.fps)) + 1
+        times = [args.start + i / args.fps for i in range(n_frames)]
+
+    triangles = mesh_triangles(mesh)
+    normals = surface_normal(triangles)
+
+    obj_directory = None
+    if args.obj is not None:
+        obj_directory = Path(args.obj)
+        obj_directory.mkdir(parents=True, exist_ok=True)
+        write_mtl(obj_directory / f"{Path(model).stem}.mtl", materials)
+
+    cache = None
+    if args.cache is not None:
+        cache = VertexCacheWriter(
+            args.cache, mesh.records, len(triangles) * 3, args.precision
+        )
+
+    try:
+        frames = explode_frames(triangles, config.simulation, args.seed, times)
+        for i, (time, corners) in enumerate(frames):
+            if obj_directory is not None:
+                path = obj_directory / f"{Path(model).stem}_{i:05d}.obj"
+                write_obj(path, corners, normals, materials, f"{Path(model).stem}.mtl")
+            if cache is not None:
+                cache.write(time, corners)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Export the exploded model as OBJ files or a vertex cache"
+    )
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=None,
+        help="parameter file, config.toml by default",
+    )
+    parser.add_argument("--model", default=None, help="OBJ file, the car by default")
+    parser.add_argument("--format", default=None, help="OBJ format of --model")
+    parser.add_argument("--seed", type=float, default=42.0)
+    parser.add_argument("--times", type=float, nargs="+", default=None)
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--end", type=float, default=0.0)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--obj", default=None, help="directory for one OBJ per time")
+    parser.add_argument("--cache", default=None, help="binary vertex cache file")
+    parser.add_argument("--precision", choices=list(PRECISIONS), default="float32")
+    return parser.parse_args(argv)
+
+
+def write_mtl(path, materials):
+    with open(path, "w") as fh:
+        for material in materials:
+            fh.write(f"newmtl {material.name}\n")
+            fh.write(f"Ka {_vector(material.ambient)}\n")
+            fh.write(f"Kd {_vector(material.diffuse)}\n")
+            fh.write(f"Ks {_vector(material.specular)}\n")
+            fh.write(f"Ns {material.shininess:.6f}\n\n")
+
+
+def write_obj(path, corners, normals, materials, mtllib):
+    # Triangles the shader would not draw (NaN corners) are left out of the faces
+    corners = corners.reshape(-1, 3)
+    visible = ~np.isnan(corners).reshape(-1, 9).any(axis=1)
+
+    with open(path, "w") as fh:
+        fh.write(f"mtllib {mtllib}\n")
+        np.savetxt(fh, np.nan_to_num(corners), fmt="v %.6f %.6f %.6f")
+        np.savetxt(fh, np.nan_to_num(normals), fmt="vn %.6f %.6f %.6f")
+
+        for material in materials:
+            start, count = material.vbo_range
+            triangles = np.arange(start // 3, (start + count) // 3)
+            triangles = triangles[visible[triangles]]
+            if len(triangles) == 0:
+                continue
+
+            # 1-based v//vn pairs: vertices 3t+1..3t+3 share normal t+1
+            faces = np.empty((len(triangles), 6), dtype=np.int64)
+            faces[:, 0::2] = triangles[:, None] * 3 + np.arange(1, 4)
+            faces[:, 1::2] = triangles[:, None] + 1
+            fh.write(f"usemtl {material.name}\n")
+            np.savetxt(fh, faces, fmt="f %d//%d %d//%d %d//%d")
+
+
+class VertexCacheWriter:
+    # Header: magic, version, JSON length and JSON with the vertex count,
+    # precision and material ranges. Then per frame: float32 time, for uint16
+    # the float32 minimum and step per axis, and the vertex positions.
+    def __init__(self, path, records, vertex_count, precision="float32"):
+        self._vertex_count = vertex_count
+        self._precision = precision
+        self._fh = open(path, "wb")
+
+        header = json.dumps(
+            {
+                "vertex_count": vertex_count,
+                "precision": precision,
+                "materials": [
+                    {"name": r["name"], "vbo_range": r["vbo_range"]} for r in records
+                ],
+            }
+        ).encode()
+        self._fh.write(VERTEX_CACHE_MAGIC)
+        self._fh.write(struct.pack("<II", VERTEX_CACHE_VERSION, len(header)))
+        self._fh.write(header)
+
+    def write(self, time, corners):
+        positions = np.asarray(corners, dtype=np.float32).reshape(-1, 3)
+        if len(positions) != self._vertex_count:
+            raise ValueError(f"Expected {self._vertex_count} vertices per frame")
+
+        self._fh.write(struct.pack("<f", time))
+        if self._precision == "uint16":
+            positions = np.nan_to_num(positions)
+            minimum = positions.min(axis=0)
+            step = (positions.max(axis=0) - minimum) / 65535
+            step[step == 0] = 1
+            self._fh.write(np.concatenate((minimum, step)).astype("<f4").tobytes())
+            positions = np.round((positions - minimum) / step).astype("<u2")
+        else:
+            dtype = np.dtype(PRECISIONS[self._precision]).newbyteorder("<")
+            positions = positions.astype(dtype)
+
+        self._fh.write(positions.tobytes())
+
+    def close(self):
+        self._fh.close()
+
+
+def read_vertex_cache(path):
+    # Yields (time, float32 positions) for every frame of a vertex cache
+    with open(path, "rb") as fh:
+        if fh.read(len(VERTEX_CACHE_MAGIC)) != VERTEX_CACHE_MAGIC:
+            raise ValueError(f"{path} is not a vertex cache")
+        version, header_length = struct.unpack("<II", fh.read(8))
+        if version != VERTEX_CACHE_VERSION:
+            raise ValueError(f"Unsupported vertex cache version {version}")
+        header = json.loads(fh.read(header_length))
+
+        count = header["vertex_count"] * 3
+        dtype = np.dtype(PRECISIONS[header["precision"]]).newbyteorder("<")
+        while True:
+            data = fh.read(4)
+            if not data:
+                return
+            (time,) = struct.unpack("<f", data)
+
+            if header["precision"] == "uint16":
+                minimum, step = np.frombuffer(fh.read(24), dtype="<f4").reshape(2, 3)
+                positions = np.frombuffer(fh.read(count * 2), dtype=dtype)
+                positions = positions.reshape(-1, 3) * step + minimum
+            else:
+                positions = np.frombuffer(fh.read(count * dtype.itemsize), dtype=dtype)
+                positions = positions.reshape(-1, 3)
+
+            yield time, positions.astype(np.float32)
+
+
+def _vector(values):
+    return " ".join(f"{value:.6f}" for value in values)
+
+
+if __name__ == "__main__":
+    main()
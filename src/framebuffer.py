@@ -0,0 +1,81 @@
+from OpenGL.GL import *
+
+
+class Framebuffer:
+    def __init__(self, size, samples=1):
+        self._size = size
+        self._renderbuffers = []
+
+        # Multisampled frames are resolved into a plain framebuffer for readback
+        self._resolve_fbo = self._create_framebuffer(1, depth=samples == 1)
+        self._fbo = self._resolve_fbo
+        if samples > 1:
+            self._fbo = self._create_framebuffer(samples, depth=True)
+
+    def bind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self._fbo)
+        glViewport(0, 0, *self._size)
+
+    def resolve(self):
+        if self._fbo != self._resolve_fbo:
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self._fbo)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self._resolve_fbo)
+            width, height = self._size
+            glBlitFramebuffer(
+                0,
+                0,
+                width,
+                height,
+                0,
+                0,
+                width,
+                height,
+                GL_COLOR_BUFFER_BIT,
+                GL_NEAREST,
+            )
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self._resolve_fbo)
+
+    def present(self, size):
+        # Resolves and stretches the frame over the window's default framebuffer
+        self.resolve()
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        filter = GL_NEAREST if tuple(size) == tuple(self._size) else GL_LINEAR
+        width, height = self._size
+        glBlitFramebuffer(
+            0, 0, width, height, 0, 0, size[0], size[1], GL_COLOR_BUFFER_BIT, filter
+        )
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(0, 0, *size)
+
+    def close(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        framebuffers = list({self._fbo, self._resolve_fbo})
+        glDeleteFramebuffers(len(framebuffers), framebuffers)
+        glDeleteRenderbuffers(len(self._renderbuffers), self._renderbuffers)
+        self._renderbuffers = []
+
+    def _create_framebuffer(self, samples, depth):
+        fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+
+        attachments = [(GL_RGBA8, GL_COLOR_ATTACHMENT0)]
+        if depth:
+            attachments.append((GL_DEPTH_COMPONENT24, GL_DEPTH_ATTACHMENT))
+
+        for format, attachment in attachments:
+            renderbuffer = glGenRenderbuffers(1)
+            glBindRenderbuffer(GL_RENDERBUFFER, renderbuffer)
+            glRenderbufferStorageMultisample(
+                GL_RENDERBUFFER, samples if samples > 1 else 0, format, *self._size
+            )
+            glFramebufferRenderbuffer(
+                GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, renderbuffer
+            )
+            self._renderbuffers.append(renderbuffer)
+
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("Framebuffer is incomplete")
+
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        return fbo
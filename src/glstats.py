@@ -0,0 +1,41 @@
+import functools
+import sys
+from pathlib import Path
+
+import OpenGL.GL
+
+SOURCE_DIR = Path(__file__).resolve().parent
+
+
+class GLCallCounter:
+    def __init__(self):
+        # Counts the calls made from every module of this directory that has
+        # been imported, by replacing the gl functions it imported with
+        # counting wrappers. Calls of imgui's renderer are not counted.
+        self._count = 0
+        self._last_frame = 0
+
+        for module in list(sys.modules.values()):
+            path = getattr(module, "__file__", None)
+            if path is None or Path(path).resolve().parent != SOURCE_DIR:
+                continue
+            namespace = vars(module)
+            for name, value in list(namespace.items()):
+                if name.startswith("gl") and value is getattr(OpenGL.GL, name, None):
+                    namespace[name] = self._wrap(value)
+
+    @property
+    def last_frame(self):
+        return self._last_frame
+
+    def end_frame(self):
+        self._last_frame = self._count
+        self._count = 0
+
+    def _wrap(self, function):
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            self._count += 1
+            return function(*args, **kwargs)
+
+        return counted
@@ -0,0 +1,121 @@
+import argparse
+import os
+import struct
+import sys
+import zlib
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+from config import Config
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    select_platform(args.platform)
+    from offscreen import OffscreenWindow
+
+    config = Config.from_file(args.config)
+    if args.size is not None:
+        config = replace(config, window=replace(config.window, size=tuple(args.size)))
+
+    fps = args.fps or config.window.fps
+    n_frames = int(round((args.end - args.start) * fps)) + 1
+    times = [args.start + i / fps for i in range(n_frames)]
+
+    if args.output == "-":
+        sink = RawPipe(sys.stdout.buffer)
+    else:
+        sink = PngSequence(args.output)
+
+    window = OffscreenWindow(config, args.seed, args.platform, args.samples)
+    try:
+        for frame in window.render(times):
+            sink.write(frame)
+    finally:
+        window.close()
+        sink.close()
+
+
+def select_platform(platform):
+    # PyOpenGL picks its platform on first import, so the offscreen modules
+    # have to be imported after this call
+    os.environ["PYOPENGL_PLATFORM"] = platform
+    if platform == "egl":
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+    # Raw frames go to stdout, which must not get pygame's banner
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Render explosion frames without a display"
+    )
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=None,
+        help="parameter file, config.toml by default",
+    )
+    parser.add_argument("--start", type=float, default=0.0, help="first frame time [s]")
+    parser.add_argument("--end", type=float, required=True, help="last frame time [s]")
+    parser.add_argument("--fps", type=int, default=None, help="frames per second")
+    parser.add_argument("--seed", type=float, default=42.0)
+    parser.add_argument("--size", type=int, nargs=2, default=None, metavar=("W", "H"))
+    parser.add_argument("--samples", type=int, default=4, help="MSAA samples")
+    parser.add_argument("--platform", choices=["egl", "osmesa"], default="egl")
+    parser.add_argument(
+        "--output",
+        default="frames",
+        help="directory for the PNG sequence, '-' writes raw rgb24 to stdout",
+    )
+    return parser.parse_args(argv)
+
+
+class PngSequence:
+    def __init__(self, directory):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._index = 0
+
+    def write(self, frame):
+        write_png(self._directory / f"frame_{self._index:05d}.png", frame)
+        self._index += 1
+
+    def close(self):
+        pass
+
+
+class RawPipe:
+    # For piping into ffmpeg: -f rawvideo -pix_fmt rgb24 -s WxH -r FPS -i -
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, frame):
+        self._stream.write(frame.tobytes())
+
+    def close(self):
+        self._stream.flush()
+
+
+def write_png(path, frame):
+    height, width, _ = frame.shape
+    # Every row starts with filter type 0 (none)
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(height, -1)
+
+    def chunk(kind, data):
+        checksum = zlib.crc32(kind + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", checksum)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    with open(path, "wb") as fh:
+        fh.write(b"\x89PNG\r\n\x1a\n")
+        fh.write(chunk(b"IHDR", header))
+        fh.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+        fh.write(chunk(b"IEND", b""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import time
+
+
+class ShaderReloader:
+    # Watches the source files of the shaders and rebuilds the ones that
+    # changed. The new program is built next to the running one, which keeps
+    # drawing until it linked successfully. With ARB_parallel_shader_compile
+    # the driver builds it on its own threads and the swap happens in a later
+    # frame, so editing a shader does not stall rendering.
+    def __init__(self, shaders, interval=0.5):
+        self._shaders = list(shaders)
+        self._interval = interval
+        self._mtimes = self._stat()
+        self._next_check = time.monotonic() + interval
+        self._error = None
+
+    @property
+    def error(self):
+        return self._error
+
+    def poll(self):
+        # Returns the shaders whose program was replaced in this call
+        swapped = []
+        for shader in self._shaders:
+            try:
+                if shader.swap():
+                    swapped.append(shader)
+                    self._error = None
+            except RuntimeError as e:
+                self._error = str(e)
+
+        now = time.monotonic()
+        if now < self._next_check:
+            return swapped
+        self._next_check = now + self._interval
+
+        mtimes = self._stat()
+        for shader in self._shaders:
+            if any(mtimes[path] != self._mtimes[path] for path in shader.paths):
+                try:
+                    shader.reload()
+                except OSError as e:
+                    self._error = str(e)
+        self._mtimes = mtimes
+
+        return swapped
+
+    def _stat(self):
+        mtimes = {}
+        for shader in self._shaders:
+            for path in shader.paths:
+                try:
+                    mtimes[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    mtimes[path] = None
+        return mtimes
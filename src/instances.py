@@ -0,0 +1,128 @@
+import math
+
+import numpy as np
+from OpenGL.GL import *
+from pyglm import glm
+
+from config import InstanceConfig
+from uniforms import STORAGE_BINDINGS
+
+# mat4 transform, vec4 (explosion origin offset, seed), float start time
+FLOATS_PER_INSTANCE = 21
+
+
+class InstanceBuffer:
+    def __init__(self, transforms, origin_offsets, seeds, start_times, random=None):
+        # random: mask of the instances whose seed reseed() replaces, all of
+        # them by default
+        self._random = np.ones(len(transforms), dtype=bool)
+        if random is not None:
+            self._random[:] = random
+        self._data = np.zeros((len(transforms), FLOATS_PER_INSTANCE), dtype=np.float32)
+        for i, transform in enumerate(transforms):
+            self._data[i, 0:16] = np.asarray(transform, dtype=np.float32).T.ravel()
+        self._data[:, 16:19] = origin_offsets
+        self._data[:, 19] = seeds
+        self._data[:, 20] = start_times
+
+        self._vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glBufferData(GL_ARRAY_BUFFER, self._data.nbytes, self._data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    @classmethod
+    def from_config(cls, scene, seed):
+        rng = np.random.default_rng(int(seed * 1000))
+        instances = scene.instances
+        if not instances:
+            instances = _grid(scene, rng)
+
+        transforms = []
+        for instance in instances:
+            transform = glm.translate(glm.mat4(1.0), glm.vec3(*instance.position))
+            transform = glm.rotate(
+                transform, math.radians(instance.rotation), glm.vec3(0, 1, 0)
+            )
+            transforms.append(glm.scale(transform, glm.vec3(instance.scale)))
+
+        return cls(
+            transforms,
+            [instance.origin_offset for instance in instances],
+            [
+                rng.uniform(0, 100) if instance.seed is None else instance.seed
+                for instance in instances
+            ],
+            [instance.start_time for instance in instances],
+            [instance.seed is None for instance in instances],
+        )
+
+    @property
+    def count(self):
+        return len(self._data)
+
+    def reseed(self, seed):
+        # Seeds set in the config are kept
+        rng = np.random.default_rng(int(seed * 1000))
+        self._data[self._random, 19] = rng.uniform(0, 100, int(self._random.sum()))
+
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, self._data.nbytes, self._data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def attach(self):
+        # Adds the per-instance attributes to the currently bound VAO
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        stride = 4 * FLOATS_PER_INSTANCE
+        layout = [(4, 4, 0), (5, 4, 4), (6, 4, 8), (7, 4, 12), (8, 4, 16), (9, 1, 20)]
+        for location, n_floats, offset in layout:
+            glVertexAttribPointer(
+                location,
+                n_floats,
+                GL_FLOAT,
+                GL_FALSE,
+                stride,
+                ctypes.c_void_p(4 * offset),
+            )
+            glEnableVertexAttribArray(location)
+            glVertexAttribDivisor(location, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    @staticmethod
+    def set_defaults():
+        # Values of the per-instance attributes in draws without instances,
+        # which leave their arrays disabled: the identity transform, no origin
+        # offset and a start time of 0
+        for location, column in zip(range(4, 8), np.eye(4)):
+            glVertexAttrib4f(location, *column)
+        glVertexAttrib4f(8, 0.0, 0.0, 0.0, 0.0)
+        glVertexAttrib1f(9, 0.0)
+
+    def bind_storage(self):
+        glBindBufferBase(
+            GL_SHADER_STORAGE_BUFFER, STORAGE_BINDINGS["Instances"], self._vbo
+        )
+
+    def close(self):
+        if self._vbo is not None:
+            glDeleteBuffers(1, [self._vbo])
+        self._vbo = None
+
+
+def _grid(scene, rng):
+    nx, ny, nz = scene.grid
+    instances = []
+    for x in range(nx):
+        for y in range(ny):
+            for z in range(nz):
+                position = [
+                    (i - (n - 1) / 2) * spacing
+                    for i, n, spacing in zip((x, y, z), scene.grid, scene.spacing)
+                ]
+                instances.append(
+                    InstanceConfig(
+                        position=tuple(position),
+                        rotation=rng.uniform(0, 360),
+                        start_time=rng.uniform(0, scene.start_time_spread),
+                    )
+                )
+    return instances
@@ -1,39 +1,411 @@
+import os
+import tempfile
+
 import numpy as np
-import pywavefront
 from OpenGL.GL import *
 from pyglm import glm
 
+from compact import MATERIAL_OFFSET, CompactVertices
+from culling import ClusterBounds
+from explosion import bake_explosion
+from obj_parser import check_cancelled, parse_format, parse_obj, stream_obj
+from spatial import (
+    TriangleGrid,
+    clip_runs,
+    complement_runs,
+    intersect_runs,
+    triangle_runs,
+)
+from uniforms import BLOCK_BINDINGS, STORAGE_BINDINGS
+
+MAX_BATCHED_MATERIALS = 256
+# std140 size of the Material struct: three vec3 padded to vec4, shininess in the last
+MATERIAL_STRIDE = 48
+# should_explode for triangles outside the falloff, which only fall with gravity
+STATIC_EXPLOSION = 2
+# Invocations per work group of the explosion compute shader, and the number
+# of work groups every implementation allows in one dispatch
+COMPUTE_GROUP_SIZE = 64
+MAX_COMPUTE_GROUPS = 65535
+
+
+class Mesh:
+    def __init__(
+        self,
+        filepath,
+        format,
+        cache=None,
+        compact=False,
+        chunk_bytes=None,
+        cancelled=None,
+        grid=False,
+    ) -> None:
+        # Files larger than chunk_bytes are streamed into a memory-mapped file.
+        # Setting the `cancelled` event raises ParseCancelled between steps.
+        self.format = parse_format(format)
+        self.floats_per_vertex = sum(n_floats for _, n_floats, _ in self.format)
+        key = None if cache is None else cache.key(filepath, format)
+        self.vertices, self.records = self._load(
+            filepath, key, cache, chunk_bytes, cancelled
+        )
+
+        # Grid over the triangles for ObjectLoader.partition(), stored with
+        # the cache entry
+        self.grid = None
+        if grid:
+            check_cancelled(cancelled)
+            self.grid = self._triangle_grid(key, cache)
+
+        # Indexed, quantized copy of the vertices that ObjectLoader uploads
+        # instead of the float data
+        self.compact = None
+        if compact:
+            check_cancelled(cancelled)
+            self.compact = CompactVertices(
+                self.vertices,
+                self.format,
+                self.floats_per_vertex,
+                [record["vbo_range"] for record in self.records],
+            )
+
+    @property
+    def nbytes(self):
+        if self.compact is not None:
+            return self.compact.nbytes
+        return self.vertices.nbytes
+
+    def _load(self, filepath, key, cache, chunk_bytes, cancelled):
+        if cache is not None:
+            cached = cache.load(key)
+            if cached is not None:
+                return cached
+
+        if chunk_bytes and os.path.getsize(filepath) > chunk_bytes:
+
+            def write(output):
+                return stream_obj(filepath, self.format, output, chunk_bytes, cancelled)
+
+            if cache is not None:
+                return cache.stream(key, write)
+            with tempfile.TemporaryFile() as output:
+                return write(output)
+
+        check_cancelled(cancelled)
+        vertices, records = parse_obj(filepath, self.format)
+
+        check_cancelled(cancelled)
+        if cache is not None:
+            cache.store(key, vertices, records)
+
+        return vertices, records
+
+    def _triangle_grid(self, key, cache):
+        if cache is not None:
+            arrays = cache.load_grid(key)
+            if arrays is not None:
+                return TriangleGrid.from_arrays(arrays)
+
+        vertices = self.vertices.reshape(-1, self.floats_per_vertex)
+        offset = next(offset for name, _, offset in self.format if name == "V")
+        grid = TriangleGrid(vertices[:, offset : offset + 3])
+        if cache is not None:
+            cache.store_grid(key, grid.arrays())
+        return grid
+
 
 class ObjectLoader:
-    def __init__(self, filepath, format) -> None:
-        self._scene = self._load_obj(filepath)
-        self._format = self._parse_format(format)
-        self._floats_per_vertex = sum(n_floats for _, n_floats, _ in self._format)
-        self._vao, self._vbo, self._materials = self._create_buffers()
+    def __init__(self, mesh, chunk_bytes=None, keep_vertices=True) -> None:
+        # Without keep_vertices the float vertices are not held after the
+        # upload, and bake(), cull() and partition() are not available
+        self._format = mesh.format
+        self._floats_per_vertex = mesh.floats_per_vertex
+        self._vertex_count = len(mesh.vertices) // mesh.floats_per_vertex
+        self._materials = [self.Material.from_record(r) for r in mesh.records]
+        self._compact = mesh.compact
+        data = mesh.vertices if mesh.compact is None else mesh.compact.data
+        self._nbytes = mesh.nbytes
+        self._vao, self._vbo = self._create_buffers(
+            data if chunk_bytes is None else None
+        )
+        self._material_vbo, self._material_ubo = self._create_material_buffers()
+        self._instances = None
+
+        self._vertices = mesh.vertices if keep_vertices else None
+        self._vertex_texture = None
+        self._baked_vbo = None
+        self._baked_state = None
+        self._clusters = None
+        self._grid = mesh.grid
+        self._partition = None
+        self._partition_state = None
+
+        self._pending = None if chunk_bytes is None else data.view(np.uint8)
+        self._uploaded = self._nbytes if chunk_bytes is None else 0
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    @property
+    def vertex_count(self):
+        # Corners of all triangles, shared vertices counted for every triangle
+        return self._vertex_count
+
+    @property
+    def bytes_per_triangle(self):
+        if self._vertex_count == 0:
+            return 0.0
+        return self._nbytes / (self._vertex_count // 3)
+
+    @property
+    def progress(self):
+        return 1.0 if self._nbytes == 0 else self._uploaded / self._nbytes
 
-    def render(self, program, model):
+    def upload(self, max_bytes):
+        if self._pending is None:
+            return True
+
+        start = self._uploaded
+        chunk = self._pending[start : start + max(1, max_bytes)]
+
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, self._uploaded, chunk.nbytes, chunk)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        self._uploaded += chunk.nbytes
+        if self._uploaded >= self._nbytes:
+            self._pending = None
+
+        return self._pending is None
+
+    def bake(
+        self,
+        model,
+        explosion_origin,
+        falloff_radius,
+        falloff_strength,
+        random_strength,
+        seed,
+    ):
+        # Stores the per-triangle explosion offset and face normal as
+        # attributes 10 and 11, recomputed only when the parameters change
+        state = (
+            tuple(model.to_tuple()),
+            tuple(explosion_origin),
+            falloff_radius,
+            falloff_strength,
+            random_strength,
+            seed,
+        )
+        if state == self._baked_state:
+            return
+
+        vertices = self._kept_vertices()
+        offset = self._position_offset()
+        positions = np.ones((len(vertices), 4), dtype=np.float32)
+        positions[:, :3] = vertices[:, offset : offset + 3]
+        positions = positions @ np.asarray(model, dtype=np.float32).T
+
+        offsets, normals = bake_explosion(
+            positions[:, :3].reshape(-1, 3, 3),
+            explosion_origin,
+            falloff_radius,
+            falloff_strength,
+            random_strength,
+            seed,
+        )
+        baked = np.repeat(np.concatenate((offsets, normals), axis=1), 3, axis=0)
+
+        if self._baked_vbo is None:
+            self._baked_vbo = glGenBuffers(1)
+            glBindVertexArray(self._vao)
+            glBindBuffer(GL_ARRAY_BUFFER, self._baked_vbo)
+            glBufferData(GL_ARRAY_BUFFER, baked.nbytes, baked, GL_DYNAMIC_DRAW)
+            for location, offset in [(10, 0), (11, 12)]:
+                glVertexAttribPointer(
+                    location, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(offset)
+                )
+                glEnableVertexAttribArray(location)
+            glBindVertexArray(0)
+        else:
+            glBindBuffer(GL_ARRAY_BUFFER, self._baked_vbo)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, baked.nbytes, baked)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        self._baked_state = state
+
+    def cull(
+        self,
+        model,
+        view_projection,
+        cluster_triangles,
+        time,
+        explosion_origin,
+        magnitude,
+        falloff_radius,
+        falloff_strength,
+        impulse_decay,
+        gravity_power,
+    ):
+        # Visibility mask of the triangle clusters for render(), the bounds are
+        # computed on the first call
+        if self._clusters is None or self._clusters.size != cluster_triangles:
+            vertices = self._kept_vertices()
+            offset = self._position_offset()
+            self._clusters = ClusterBounds(
+                vertices[:, offset : offset + 3],
+                [material.vbo_range for material in self._materials],
+                cluster_triangles,
+            )
+
+        return self._clusters.visible(
+            model,
+            view_projection,
+            time,
+            explosion_origin,
+            magnitude,
+            falloff_radius,
+            falloff_strength,
+            impulse_decay,
+            gravity_power,
+        )
+
+    def partition(self, model, explosion_origins, falloff_radius, falloff_strength):
+        # (affected, static) vertex runs for render(): the triangles that the
+        # explosion around any of the origins can displace and the ones that
+        # only fall with gravity. Only the cells of the mesh's grid around the
+        # origins are looked at.
+        state = (
+            tuple(model.to_tuple()),
+            tuple(tuple(origin) for origin in explosion_origins),
+            falloff_radius,
+            falloff_strength,
+        )
+        if state == self._partition_state:
+            return self._partition
+
+        if self._grid is None:
+            raise RuntimeError("The mesh was parsed without a triangle grid")
+
+        if falloff_strength <= 0:
+            # pow(0, 0) in the shader's falloff moves every triangle
+            everything = np.array([0], dtype=np.int32)
+            affected = everything, np.array([self._vertex_count], dtype=np.int32)
+        else:
+            # Distances in model space shrink by at most the smallest scale of
+            # the model matrix. The margin keeps triangles right at the radius
+            # on the exploding side.
+            matrix = np.asarray(model, dtype=np.float64)
+            inverse = np.linalg.inv(matrix)
+            origins = np.asarray(explosion_origins, dtype=np.float64)
+            origins = origins @ inverse[:3, :3].T + inverse[:3, 3]
+            scales = np.linalg.svd(matrix[:3, :3], compute_uv=False)
+            reach = (falloff_radius * (1 + 1e-4) + 1e-4) / scales[-1]
+            ids = self._grid.query(origins, reach, scales[0] / scales[-1])
+            affected = triangle_runs(ids)
+
+        self._partition = affected, complement_runs(affected, 0, self._vertex_count)
+        self._partition_state = state
+        return self._partition
+
+    def render(self, shader, model, instances=None, visible=None, partition=None):
+        # `visible` from cull() limits the draws to the clusters in view,
+        # `partition` from partition() draws the static triangles with
+        # should_explode set to STATIC_EXPLOSION
         if self._vao is None or self._vbo is None:
             raise RuntimeError("object was already deleted")
 
-        model_loc = glGetUniformLocation(program, "model_matrix")
+        model_loc = shader.location("model_matrix")
         glUniformMatrix4fv(model_loc, 1, GL_FALSE, glm.value_ptr(model))
 
+        if "VERTEX_EXPLOSION" in shader.defines:
+            self._bind_vertex_texture(shader)
+        if self._compact is not None:
+            glUniform3fv(
+                shader.location("position_scale"), 1, self._compact.position_scale
+            )
+            glUniform3fv(
+                shader.location("position_bias"), 1, self._compact.position_bias
+            )
+
         glBindVertexArray(self._vao)
-        for material in self._materials:
-            start, count = material.vbo_range
-            self._upload_uniforms(program, material)
-            glDrawArrays(GL_TRIANGLES, start, count)
+        if instances is not None and instances is not self._instances:
+            instances.attach()
+            self._instances = instances
+
+        if partition is not None:
+            draw = lambda start, count: self._draw_partition(
+                shader, start, count, visible, partition
+            )
+        elif visible is None:
+            draw = lambda start, count: self._draw(start, count, instances)
+        else:
+            draw = lambda start, count: self._draw_visible(start, count, visible)
+        self._render_materials(shader, draw)
+        glBindVertexArray(0)
+
+    def dispatch(self, shader, model, instances=None):
+        # Runs the explosion compute shader with one invocation per triangle
+        # and instance, the output buffer is bound by the caller
+        glUseProgram(shader.program)
+        glUniformMatrix4fv(
+            shader.location("model_matrix"), 1, GL_FALSE, glm.value_ptr(model)
+        )
+        glUniform1i(shader.location("floats_per_vertex"), self._floats_per_vertex)
+        glUniform1i(shader.location("position_offset"), self._position_offset())
+        triangle_count = self.vertex_count // 3
+        glUniform1i(shader.location("triangle_count"), triangle_count)
+
+        glBindBufferBase(
+            GL_SHADER_STORAGE_BUFFER, STORAGE_BINDINGS["MeshVertices"], self._vbo
+        )
+        glBindBufferBase(
+            GL_SHADER_STORAGE_BUFFER,
+            STORAGE_BINDINGS["MeshMaterials"],
+            self._material_vbo,
+        )
+
+        count = 1
+        if instances is not None:
+            instances.bind_storage()
+            count = instances.count
+
+        # Large meshes take several dispatches of at most MAX_COMPUTE_GROUPS
+        groups = -(-triangle_count // COMPUTE_GROUP_SIZE)
+        for first in range(0, groups, MAX_COMPUTE_GROUPS):
+            glUniform1i(shader.location("triangle_offset"), first * COMPUTE_GROUP_SIZE)
+            glDispatchCompute(min(groups - first, MAX_COMPUTE_GROUPS), count, 1)
+
+    def replay(self, shader, vao, repeat=1):
+        # Draws captured output, which holds every material range `repeat` times
+        glBindVertexArray(vao)
+        self._render_materials(
+            shader,
+            lambda start, count: glDrawArrays(
+                GL_TRIANGLES, start * repeat, count * repeat
+            ),
+        )
         glBindVertexArray(0)
 
     def close(self):
         if self._vbo is not None:
-            glDeleteBuffers(1, [self._vbo])
+            glDeleteBuffers(2, [self._vbo, self._material_ubo])
+        if self._material_vbo is not None:
+            glDeleteBuffers(1, [self._material_vbo])
+        if self._baked_vbo is not None:
+            glDeleteBuffers(1, [self._baked_vbo])
+        if self._vertex_texture is not None:
+            glDeleteTextures(1, [self._vertex_texture])
 
         if self._vao is not None:
             glDeleteVertexArrays(1, [self._vao])
 
         self._vao = None
         self._vbo = None
+        self._material_ubo = None
+        self._material_vbo = None
+        self._baked_vbo = None
+        self._vertex_texture = None
 
     class Material:
         def __init__(self, name, ambient, diffuse, specular, shininess, vbo_range):
@@ -44,55 +416,29 @@ class ObjectLoader:
             self.shininess = shininess
             self.vbo_range = vbo_range
 
-    def _load_obj(self, filepath):
-        scene = pywavefront.Wavefront(
-            filepath, collect_faces=True, create_materials=True
-        )
-        # scene: trimesh.Scene = trimesh.load(filepath, force="scene")
-        return scene
-
-    def _parse_format(self, format):
-        result = []
-        splitted = format.split("_")
-        for i, part in enumerate(splitted):
-            primitive = part[0]
-            n_floats = int(part[1])
-            offset = sum(int(splitted[j][1]) for j in range(i))
-            result.append((primitive, n_floats, offset))
-
-        return result
-
-    def _create_buffers(self):
-        all_vertices = []
-        materials = []
-        current_offset = 0
-
-        for name, material in self._scene.materials.items():
-            vertices = np.array(material.vertices, dtype=np.float32)
-            all_vertices.append(vertices)
-            vertex_count = len(vertices) // (self._floats_per_vertex)
-
-            materials.append(
-                self.Material(
-                    name,
-                    glm.vec3(material.ambient[:-1]),
-                    glm.vec3(material.diffuse[:-1]),
-                    glm.vec3(material.specular[:-1]),
-                    material.shininess,
-                    (current_offset, vertex_count),
-                )
+        @classmethod
+        def from_record(cls, record):
+            return cls(
+                record["name"],
+                glm.vec3(record["ambient"]),
+                glm.vec3(record["diffuse"]),
+                glm.vec3(record["specular"]),
+                record["shininess"],
+                tuple(record["vbo_range"]),
             )
 
-            current_offset += vertex_count
-
-        vertices = np.concatenate(all_vertices)
-
+    def _create_buffers(self, vertices):
         vao = glGenVertexArrays(1)
         vbo = glGenBuffers(1)
 
         glBindVertexArray(vao)
         glBindBuffer(GL_ARRAY_BUFFER, vbo)
-        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBufferData(GL_ARRAY_BUFFER, self._nbytes, vertices, GL_STATIC_DRAW)
+
+        if self._compact is not None:
+            self._set_compact_attributes(vbo)
+            glBindVertexArray(0)
+            return vao, vbo
 
         stride = 4 * (self._floats_per_vertex)
 
@@ -111,13 +457,164 @@ class ObjectLoader:
 
         glBindVertexArray(0)
 
-        return vao, vbo, materials
+        return vao, vbo
+
+    def _set_compact_attributes(self, vbo):
+        # The indices follow the vertices in the same buffer
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, vbo)
+        stride = self._compact.stride
+        for location, size, type, normalized, offset in self._compact.attributes:
+            glVertexAttribPointer(
+                location, size, type, normalized, stride, ctypes.c_void_p(offset)
+            )
+            glEnableVertexAttribArray(location)
+        glVertexAttribIPointer(
+            3, 1, GL_UNSIGNED_SHORT, stride, ctypes.c_void_p(MATERIAL_OFFSET)
+        )
+        glEnableVertexAttribArray(3)
+
+    def _create_material_buffers(self):
+        counts = [material.vbo_range[1] for material in self._materials]
+        indices = np.arange(len(counts)) % MAX_BATCHED_MATERIALS
+        indices = np.repeat(indices, counts).astype(np.uint8)
+        # Whole uints for the compute shader, which reads four indices at once
+        indices = np.concatenate((indices, np.zeros(-len(indices) % 4, np.uint8)))
+
+        # Compact vertices carry the index themselves
+        vbo = None
+        if self._compact is None:
+            glBindVertexArray(self._vao)
+            vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, vbo)
+            glBufferData(GL_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+            glVertexAttribIPointer(3, 1, GL_UNSIGNED_BYTE, 0, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(3)
+            glBindVertexArray(0)
+
+        # Padded to whole groups so every group can be bound with the same size
+        n_groups = -(-len(self._materials) // MAX_BATCHED_MATERIALS)
+        table = np.zeros((n_groups * MAX_BATCHED_MATERIALS, 12), dtype=np.float32)
+        for i, material in enumerate(self._materials):
+            table[i, 0:3] = material.ambient
+            table[i, 4:7] = material.diffuse
+            table[i, 8:11] = material.specular
+            table[i, 11] = material.shininess
+
+        ubo = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, ubo)
+        glBufferData(GL_UNIFORM_BUFFER, table.nbytes, table, GL_STATIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+        return vbo, ubo
+
+    def _kept_vertices(self):
+        if self._vertices is None:
+            raise RuntimeError("The model was loaded without keep_vertices")
+        return self._vertices.reshape(-1, self._floats_per_vertex)
+
+    def _position_offset(self):
+        return next(offset for name, _, offset in self._format if name == "V")
+
+    def _bind_vertex_texture(self, shader):
+        # The vertex-only explosion reads whole triangles from the vertex buffer
+        if self._vertex_texture is None:
+            self._vertex_texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_BUFFER, self._vertex_texture)
+            glTexBuffer(GL_TEXTURE_BUFFER, GL_R32F, self._vbo)
+
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_BUFFER, self._vertex_texture)
+        glUniform1i(shader.location("mesh_vertices"), 0)
+        glUniform1i(shader.location("floats_per_vertex"), self._floats_per_vertex)
+        glUniform1i(shader.location("position_offset"), self._position_offset())
+
+    def _draw(self, start, count, instances):
+        if self._compact is not None:
+            self._draw_elements(start, count, instances)
+        elif instances is None:
+            glDrawArrays(GL_TRIANGLES, start, count)
+        else:
+            glDrawArraysInstanced(GL_TRIANGLES, start, count, instances.count)
+
+    def _draw_elements(self, start, count, instances):
+        # Material ranges count indices in the same way as vertices
+        compact = self._compact
+        offset = compact.index_offset + int(start) * compact.index_size
+        offset = ctypes.c_void_p(offset)
+        if instances is None:
+            glDrawElements(GL_TRIANGLES, count, compact.index_type, offset)
+        else:
+            glDrawElementsInstanced(
+                GL_TRIANGLES, count, compact.index_type, offset, instances.count
+            )
+
+    def _draw_visible(self, start, count, visible):
+        self._draw_runs(*self._visible_runs(visible, start, count))
+
+    def _draw_partition(self, shader, start, count, visible, partition):
+        # Static triangles first so that should_explode is left at 1
+        affected, static = partition
+        should_explode = shader.location("should_explode")
+        for mode, runs in ((STATIC_EXPLOSION, static), (1, affected)):
+            runs = clip_runs(runs, start, count)
+            if visible is not None:
+                runs = intersect_runs(runs, self._visible_runs(visible, start, count))
+            glUniform1i(should_explode, mode)
+            self._draw_runs(*runs)
+
+    def _visible_runs(self, visible, start, count):
+        if self._clusters is None:
+            raise RuntimeError("Visibility masks come from cull()")
+        return self._clusters.runs(visible, start, count)
+
+    def _draw_runs(self, firsts, counts):
+        if len(firsts) == 1:
+            self._draw(firsts[0], counts[0], None)
+        elif len(firsts) > 1 and self._compact is not None:
+            compact = self._compact
+            offsets = compact.index_offset + firsts * compact.index_size
+            glMultiDrawElements(
+                GL_TRIANGLES,
+                counts,
+                compact.index_type,
+                (ctypes.c_void_p * len(offsets))(*offsets.tolist()),
+                len(firsts),
+            )
+        elif len(firsts) > 1:
+            glMultiDrawArrays(GL_TRIANGLES, firsts, counts, len(firsts))
+
+    def _render_materials(self, shader, draw):
+        if "BATCH_MATERIALS" in shader.defines:
+            self._render_batched(draw)
+            return
+
+        for material in self._materials:
+            start, count = material.vbo_range
+            self._upload_uniforms(shader, material)
+            draw(start, count)
+
+    def _render_batched(self, draw):
+        # One draw per group of materials that fit into the Materials block
+        group_bytes = MAX_BATCHED_MATERIALS * MATERIAL_STRIDE
+        for first in range(0, len(self._materials), MAX_BATCHED_MATERIALS):
+            group = self._materials[first : first + MAX_BATCHED_MATERIALS]
+            start = group[0].vbo_range[0]
+            end = sum(group[-1].vbo_range)
+
+            glBindBufferRange(
+                GL_UNIFORM_BUFFER,
+                BLOCK_BINDINGS["Materials"],
+                self._material_ubo,
+                first * MATERIAL_STRIDE,
+                group_bytes,
+            )
+            draw(start, end - start)
 
-    def _upload_uniforms(self, program, material):
-        ambient_loc = glGetUniformLocation(program, "material.ambient")
-        diffuse_loc = glGetUniformLocation(program, "material.diffuse")
-        specular_loc = glGetUniformLocation(program, "material.specular")
-        shininess_loc = glGetUniformLocation(program, "material.shininess")
+    def _upload_uniforms(self, shader, material):
+        ambient_loc = shader.location("material.ambient")
+        diffuse_loc = shader.location("material.diffuse")
+        specular_loc = shader.location("material.specular")
+        shininess_loc = shader.location("material.shininess")
 
         glUniform3fv(ambient_loc, 1, glm.value_ptr(material.ambient))
         glUniform3fv(diffuse_loc, 1, glm.value_ptr(material.diffuse))
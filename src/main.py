@@ -1,4 +1,8 @@
-from window import Window
+import time
 
 if __name__ == "__main__":
-    Window().run()
+    # Time to first frame includes importing the modules
+    start_time = time.perf_counter()
+    from window import Window
+
+    Window(start_time).run()
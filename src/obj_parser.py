@@ -0,0 +1,443 @@
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+_SPACE = ord(" ")
+_IS_WHITESPACE = np.zeros(256, dtype=bool)
+_IS_WHITESPACE[[ord(c) for c in " \t\r\n"]] = True
+_KEYWORDS = {"V": b"v", "T": b"vt", "N": b"vn"}
+
+
+class ParseCancelled(Exception):
+    pass
+
+
+def parse_format(format):
+    # "T2F_N3F_V3F" to the layout [("T", 2, 0), ("N", 3, 2), ("V", 3, 5)]
+    result = []
+    splitted = format.split("_")
+    for i, part in enumerate(splitted):
+        primitive = part[0]
+        n_floats = int(part[1])
+        offset = sum(int(splitted[j][1]) for j in range(i))
+        result.append((primitive, n_floats, offset))
+
+    return result
+
+
+def parse_obj(filepath, layout):
+    filepath = Path(filepath)
+    data = np.frombuffer(filepath.read_bytes(), dtype=np.uint8)
+    lines = _Lines(data)
+
+    is_face = lines.keyword(b"f")
+    if not is_face.any():
+        raise ValueError(f"{filepath} has no faces")
+    statements = _material_statements(lines, is_face, True)
+    materials, default_name = _collect_materials(filepath, statements)
+
+    positions = lines.floats(b"v", 3)
+    normals = lines.floats(b"vn", 3)
+    tex_coords = lines.floats(b"vt", 2)
+
+    material_ids = _face_materials(lines, is_face, materials, default_name)
+    corners, face_sizes, has_vt, has_vn = lines.faces(is_face)
+
+    _check_layout(filepath, layout, has_vt, has_vn)
+
+    counts_before = {
+        primitive: np.cumsum(lines.keyword(keyword))[is_face]
+        for primitive, keyword in _KEYWORDS.items()
+    }
+    indices = _corner_indices(corners, face_sizes, has_vt, has_vn, counts_before)
+
+    triangle_materials = np.repeat(material_ids, face_sizes - 2)
+    sources = {"V": positions, "N": normals, "T": tex_coords}
+    vertices, _ = _gather(layout, sources, indices, face_sizes, triangle_materials)
+
+    counts = np.bincount(triangle_materials, minlength=len(materials)) * 3
+    return vertices.ravel(), _records(materials, counts)
+
+
+def stream_obj(filepath, layout, output, chunk_bytes, cancelled=None):
+    # Same result as parse_obj for files that do not fit in memory. The file is
+    # read twice, chunk_bytes of lines at a time: the first pass stages v, vt
+    # and vn in temporary files and counts the triangles of every material,
+    # the second one writes the vertices of each chunk into their material
+    # range of `output`, a file opened with w+b, as an .npy array. Returns the
+    # vertices memory-mapped from `output` and the material records. Setting
+    # the `cancelled` event stops the parse at the next chunk.
+    filepath = Path(filepath)
+    with ExitStack() as stack:
+        staging = {
+            primitive: stack.enter_context(tempfile.TemporaryFile())
+            for primitive, _, _ in layout
+        }
+        statements = []
+        triangles = {}
+        face_layout = None
+        active = None
+        for chunk in read_chunks(filepath, chunk_bytes, cancelled):
+            lines = _Lines(np.frombuffer(chunk, dtype=np.uint8))
+            is_face = lines.keyword(b"f")
+            default_face = active is None and ("f", None) not in statements
+            statements += _material_statements(lines, is_face, default_face)
+            for primitive, n_floats, _ in layout:
+                values = lines.floats(_KEYWORDS[primitive], n_floats)
+                values = values[:, :n_floats].astype(np.float32)
+                staging[primitive].write(values.tobytes())
+
+            names, face_names, active = _chunk_materials(lines, is_face, active)
+            if not is_face.any():
+                continue
+
+            _, face_sizes, has_vt, has_vn = lines.faces(is_face)
+            if face_layout not in (None, (has_vt, has_vn)):
+                raise ValueError("faces with mixed vertex layouts are not supported")
+            face_layout = has_vt, has_vn
+
+            counts = np.bincount(face_names, face_sizes - 2, minlength=len(names))
+            for name, count in zip(names, counts):
+                triangles[name] = triangles.get(name, 0) + int(count)
+
+        if face_layout is None:
+            raise ValueError(f"{filepath} has no faces")
+        _check_layout(filepath, layout, *face_layout)
+
+        materials, default_name = _collect_materials(filepath, statements)
+        material_ids = {name: i for i, name in enumerate(materials)}
+        if default_name is not None:
+            material_ids[None] = material_ids[default_name]
+
+        counts = np.zeros(len(materials), dtype=np.int64)
+        for name, count in triangles.items():
+            if name in material_ids:
+                counts[material_ids[name]] += count * 3
+        records = _records(materials, counts)
+
+        sources = {
+            primitive: _map_staging(staging[primitive], n_floats)
+            for primitive, n_floats, _ in layout
+        }
+        floats_per_vertex = sum(n_floats for _, n_floats, _ in layout)
+        total_floats = int(counts.sum()) * floats_per_vertex
+        header = {"descr": "<f4", "fortran_order": False, "shape": (total_floats,)}
+        np.lib.format.write_array_header_1_0(output, header)
+        data_offset = output.tell()
+        output.truncate(data_offset + total_floats * 4)
+
+        cursors = np.cumsum(counts) - counts
+        seen = dict.fromkeys(_KEYWORDS, 0)
+        active = None
+        for chunk in read_chunks(filepath, chunk_bytes, cancelled):
+            lines = _Lines(np.frombuffer(chunk, dtype=np.uint8))
+            is_face = lines.keyword(b"f")
+            names, face_names, active = _chunk_materials(lines, is_face, active)
+
+            counts_before = {}
+            for primitive, keyword in _KEYWORDS.items():
+                is_keyword = lines.keyword(keyword)
+                counts_before[primitive] = np.cumsum(is_keyword)[is_face]
+                counts_before[primitive] += seen[primitive]
+                seen[primitive] += int(is_keyword.sum())
+            if not is_face.any():
+                continue
+
+            corners, face_sizes, has_vt, has_vn = lines.faces(is_face)
+            indices = _corner_indices(
+                corners, face_sizes, has_vt, has_vn, counts_before
+            )
+            lookup = np.array([material_ids.get(name, -1) for name in names])
+            triangle_materials = np.repeat(lookup[face_names], face_sizes - 2)
+            vertices, triangle_materials = _gather(
+                layout, sources, indices, face_sizes, triangle_materials
+            )
+
+            # Triangles are sorted by material, so every material is one write
+            chunk_counts = np.bincount(triangle_materials, minlength=len(materials))
+            start = 0
+            for material in np.flatnonzero(chunk_counts):
+                count = int(chunk_counts[material]) * 3
+                output.seek(
+                    data_offset + int(cursors[material]) * floats_per_vertex * 4
+                )
+                output.write(vertices[start : start + count])
+                cursors[material] += count
+                start += count
+
+    output.flush()
+    vertices = np.memmap(
+        output, dtype=np.float32, mode="r", offset=data_offset, shape=(total_floats,)
+    )
+    return vertices, records
+
+
+def read_chunks(filepath, chunk_bytes, cancelled=None):
+    # Blocks of at least chunk_bytes (or the rest of the file) that end with a
+    # complete line. Raises ParseCancelled once the `cancelled` event is set.
+    with open(filepath, "rb") as fh:
+        rest = b""
+        while block := fh.read(chunk_bytes):
+            check_cancelled(cancelled)
+            block = rest + block
+            end = block.rfind(b"\n") + 1
+            rest = block[end:]
+            if end > 0:
+                yield block[:end]
+        if rest:
+            yield rest
+
+
+def check_cancelled(cancelled):
+    if cancelled is not None and cancelled.is_set():
+        raise ParseCancelled()
+
+
+def parse_mtl(path):
+    materials = {}
+    current = None
+    with open(path, "r") as fh:
+        for line in fh:
+            values = line.split()
+            if not values:
+                continue
+
+            if values[0] == "newmtl":
+                current = _default_material()
+                materials[values[1]] = current
+            elif current is None:
+                continue
+            elif values[0] == "Ka":
+                current["ambient"] = _pad_light(values[1:])
+            elif values[0] == "Kd":
+                current["diffuse"] = _pad_light(values[1:])
+            elif values[0] == "Ks":
+                current["specular"] = _pad_light(values[1:])
+            elif values[0] == "Ns":
+                current["shininess"] = float(values[1])
+
+    return materials
+
+
+def _default_material():
+    return {
+        "ambient": [0.2, 0.2, 0.2],
+        "diffuse": [0.8, 0.8, 0.8],
+        "specular": [0.0, 0.0, 0.0],
+        "shininess": 0.0,
+    }
+
+
+def _pad_light(values):
+    return ([float(v) for v in values] + [0.0, 0.0, 0.0])[:3]
+
+
+def _material_statements(lines, is_face, default_face):
+    # (keyword, argument) of the mtllib and usemtl lines in file order. With
+    # `default_face` set, ("f", None) marks the first face before any usemtl.
+    is_mtllib = lines.keyword(b"mtllib")
+    is_usemtl = lines.keyword(b"usemtl")
+    statements = [
+        (line, keyword, argument)
+        for keyword, mask in (("mtllib", is_mtllib), ("usemtl", is_usemtl))
+        for line, argument in zip(np.flatnonzero(mask), lines.arguments(mask))
+    ]
+    if default_face:
+        unassigned = np.flatnonzero(is_face & (np.cumsum(is_usemtl) == 0))
+        if len(unassigned):
+            statements.append((unassigned[0], "f", None))
+    return [statement[1:] for statement in sorted(statements)]
+
+
+def _collect_materials(filepath, statements):
+    # Materials in the order pywavefront creates them: those of a material
+    # library when it is read, unknown usemtl names when they are used and
+    # default<n> at the first face without a material. Returns them and the
+    # name of the default, None if every face has a material.
+    materials = {}
+    default_name = None
+    for keyword, argument in statements:
+        if keyword == "mtllib":
+            path = filepath.parent / argument
+            if path.exists():
+                materials.update(parse_mtl(path))
+        elif keyword == "usemtl":
+            materials.setdefault(argument, _default_material())
+        else:
+            default_name = f"default{len(materials)}"
+            materials[default_name] = _default_material()
+    return materials, default_name
+
+
+def _face_materials(lines, is_face, materials, default_name):
+    # Every face uses the material of the closest preceding usemtl statement
+    is_usemtl = lines.keyword(b"usemtl")
+    names = lines.arguments(is_usemtl)
+    line_ids = np.where(is_usemtl, np.cumsum(is_usemtl) - 1, -1)
+    active = np.maximum.accumulate(line_ids)[is_face]
+
+    # Faces before the first usemtl index the last entry
+    order = list(materials)
+    name_ids = [order.index(name) for name in names]
+    if default_name is not None:
+        name_ids.append(order.index(default_name))
+
+    return np.array(name_ids, dtype=np.int64)[active]
+
+
+def _chunk_materials(lines, is_face, active):
+    # Names of the usemtl statements in a chunk preceded by `active`, the one
+    # active at its start (None before the first statement), the index into
+    # these names for every face and the name active at the end
+    is_usemtl = lines.keyword(b"usemtl")
+    names = [active] + lines.arguments(is_usemtl)
+    line_ids = np.where(is_usemtl, np.cumsum(is_usemtl), 0)
+    face_names = np.maximum.accumulate(line_ids)[is_face]
+    return names, face_names, names[-1]
+
+
+def _check_layout(filepath, layout, has_vt, has_vn):
+    available = {"V": True, "T": has_vt, "N": has_vn}
+    for primitive, _, _ in layout:
+        if not available.get(primitive, False):
+            raise ValueError(f"{filepath} has no '{primitive}' data for this format")
+
+
+def _corner_indices(corners, face_sizes, has_vt, has_vn, counts_before):
+    # Resolve 1-based and negative (relative) indices per corner
+    columns = {"V": 0, "T": 1 if has_vt else None, "N": 2 if has_vt else 1}
+    available = {"V": True, "T": has_vt, "N": has_vn}
+    indices = {}
+    for primitive, column in columns.items():
+        if column is None or not available[primitive]:
+            continue
+        raw = corners[:, column]
+        before = np.repeat(counts_before[primitive], face_sizes)
+        indices[primitive] = np.where(raw < 0, raw + before, raw - 1)
+    return indices
+
+
+def _gather(layout, sources, indices, face_sizes, triangle_materials):
+    # Vertices of the triangulated faces sorted by material, and the material
+    # of every triangle in that order
+    triangles = _triangulate(face_sizes)
+    order = np.argsort(triangle_materials, kind="stable")
+    triangle_corners = triangles[order].ravel()
+
+    floats_per_vertex = sum(n_floats for _, n_floats, _ in layout)
+    vertices = np.empty((len(triangle_corners), floats_per_vertex), dtype=np.float32)
+    for primitive, n_floats, offset in layout:
+        gathered = sources[primitive][indices[primitive][triangle_corners]]
+        vertices[:, offset : offset + n_floats] = gathered[:, :n_floats]
+    return vertices, triangle_materials[order]
+
+
+def _records(materials, counts):
+    records = []
+    current_offset = 0
+    for (name, material), count in zip(materials.items(), counts):
+        records.append(
+            {"name": name, **material, "vbo_range": [current_offset, int(count)]}
+        )
+        current_offset += int(count)
+    return records
+
+
+def _map_staging(fh, n_floats):
+    fh.flush()
+    if fh.seek(0, 2) == 0:
+        return np.zeros((0, n_floats), dtype=np.float32)
+    return np.memmap(fh, dtype=np.float32, mode="r").reshape(-1, n_floats)
+
+
+def _triangulate(face_sizes):
+    # Same fan order as pywavefront: (v1, v2, v3), then (vj, v1, vj-1) for j > 3
+    face_starts = np.cumsum(face_sizes) - face_sizes
+    n_triangles = face_sizes - 2
+    starts = np.repeat(face_starts, n_triangles)
+    t = np.arange(n_triangles.sum()) - np.repeat(
+        np.cumsum(n_triangles) - n_triangles, n_triangles
+    )
+
+    first = t == 0
+    return np.stack(
+        [
+            np.where(first, starts, starts + t + 2),
+            np.where(first, starts + 1, starts),
+            np.where(first, starts + 2, starts + t + 1),
+        ],
+        axis=1,
+    )
+
+
+class _Lines:
+    def __init__(self, data):
+        self._data = data
+        self._bytes = data.tobytes()
+        newline = data == ord("\n")
+        self._starts = np.concatenate(([0], np.flatnonzero(newline) + 1))
+        self._line_ids = np.cumsum(newline) - newline
+        self._padded = np.concatenate((data, np.zeros(8, dtype=np.uint8)))
+
+        # Blank out keywords and index separators so only numbers remain
+        whitespace = _IS_WHITESPACE[data]
+        seen = np.cumsum(whitespace)
+        seen_before = np.concatenate(([0], seen))[self._starts]
+        is_keyword = (seen - seen_before[self._line_ids] == 0) & ~whitespace
+
+        self._numeric = data.copy()
+        self._numeric[is_keyword | (data == ord("/")) | (data == ord("\r"))] = _SPACE
+
+        nonspace = ~_IS_WHITESPACE[self._numeric]
+        token_starts = nonspace & ~np.concatenate(([False], nonspace[:-1]))
+        self._tokens = np.bincount(
+            self._line_ids[token_starts], minlength=len(self._starts)
+        )
+
+    def keyword(self, name):
+        mask = np.ones(len(self._starts), dtype=bool)
+        for i, char in enumerate(name):
+            mask &= self._padded[self._starts + i] == char
+        return mask & _IS_WHITESPACE[self._padded[self._starts + len(name)]]
+
+    def arguments(self, mask):
+        return [" ".join(self._line(start).split()[1:]) for start in self._starts[mask]]
+
+    def floats(self, name, n_floats):
+        mask = self.keyword(name)
+        if not mask.any():
+            return np.zeros((0, n_floats), dtype=np.float64)
+
+        per_line = np.unique(self._tokens[mask])
+        if len(per_line) != 1 or per_line[0] < n_floats:
+            raise ValueError(
+                f"inconsistent number of values in '{name.decode()}' lines"
+            )
+
+        values = np.fromstring(self._payload(mask), dtype=np.float64, sep=" ")
+        return values.reshape(-1, per_line[0])
+
+    def faces(self, mask):
+        first_token = self._line(self._starts[mask][0]).split()[1]
+        n_slashes = first_token.count("/")
+        has_vt = n_slashes >= 1 and "//" not in first_token
+        has_vn = n_slashes == 2
+        per_corner = 1 + has_vt + has_vn
+
+        tokens = self._tokens[mask]
+        face_sizes = tokens // per_corner
+        slashes = np.count_nonzero(self._data[mask[self._line_ids]] == ord("/"))
+        if np.any(tokens % per_corner) or slashes != face_sizes.sum() * n_slashes:
+            raise ValueError("faces with mixed vertex layouts are not supported")
+
+        values = np.fromstring(self._payload(mask), dtype=np.int64, sep=" ")
+        return values.reshape(-1, per_corner), face_sizes, has_vt, has_vn
+
+    def _line(self, start):
+        end = self._bytes.find(b"\n", start)
+        return self._bytes[start : None if end < 0 else end].decode()
+
+    def _payload(self, mask):
+        return self._numeric[mask[self._line_ids]].tobytes()
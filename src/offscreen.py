@@ -0,0 +1,245 @@
+import ctypes
+from dataclasses import replace
+from time import perf_counter
+
+import numpy as np
+from OpenGL.GL import *
+from pyglm import glm
+
+from clock import SimulationClock
+from framebuffer import Framebuffer
+from window import Window
+
+
+class EGLContext:
+    def __init__(self, version):
+        from OpenGL import EGL
+
+        self._egl = EGL
+        self._display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(
+            self._display, ctypes.pointer(major), ctypes.pointer(minor)
+        ):
+            raise RuntimeError("Failed to initialize EGL")
+
+        config = EGL.EGLConfig()
+        n_configs = EGL.EGLint()
+        attributes = [
+            EGL.EGL_RENDERABLE_TYPE,
+            EGL.EGL_OPENGL_BIT,
+            EGL.EGL_SURFACE_TYPE,
+            EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_NONE,
+        ]
+        EGL.eglChooseConfig(
+            self._display,
+            (EGL.EGLint * len(attributes))(*attributes),
+            ctypes.pointer(config),
+            1,
+            ctypes.pointer(n_configs),
+        )
+        if n_configs.value == 0:
+            raise RuntimeError("No EGL config supports desktop OpenGL")
+
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        attributes = [
+            EGL.EGL_CONTEXT_MAJOR_VERSION,
+            version[0],
+            EGL.EGL_CONTEXT_MINOR_VERSION,
+            version[1],
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+            EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+            EGL.EGL_NONE,
+        ]
+        self._context = EGL.eglCreateContext(
+            self._display,
+            config,
+            EGL.EGL_NO_CONTEXT,
+            (EGL.EGLint * len(attributes))(*attributes),
+        )
+        if self._context == EGL.EGL_NO_CONTEXT:
+            raise RuntimeError(f"Failed to create an OpenGL {version} context")
+
+        # Rendering goes to a framebuffer object, so no surface is needed
+        EGL.eglMakeCurrent(
+            self._display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, self._context
+        )
+
+    def close(self):
+        EGL = self._egl
+        EGL.eglMakeCurrent(
+            self._display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT
+        )
+        EGL.eglDestroyContext(self._display, self._context)
+        EGL.eglTerminate(self._display)
+
+
+class OSMesaContext:
+    def __init__(self, version):
+        from OpenGL import osmesa
+
+        self._osmesa = osmesa
+        attributes = [
+            osmesa.OSMESA_FORMAT,
+            osmesa.OSMESA_RGBA,
+            osmesa.OSMESA_DEPTH_BITS,
+            24,
+            osmesa.OSMESA_PROFILE,
+            osmesa.OSMESA_CORE_PROFILE,
+            osmesa.OSMESA_CONTEXT_MAJOR_VERSION,
+            version[0],
+            osmesa.OSMESA_CONTEXT_MINOR_VERSION,
+            version[1],
+            0,
+        ]
+        self._context = osmesa.OSMesaCreateContextAttribs(attributes, None)
+        if not self._context:
+            raise RuntimeError(f"Failed to create an OpenGL {version} context")
+
+        # OSMesa needs a default buffer even though frames go to an FBO
+        self._buffer = np.zeros((1, 1, 4), dtype=np.uint8)
+        osmesa.OSMesaMakeCurrent(self._context, self._buffer, GL_UNSIGNED_BYTE, 1, 1)
+
+    def close(self):
+        self._osmesa.OSMesaDestroyContext(self._context)
+
+
+def create_context(platform, version):
+    if platform == "egl":
+        return EGLContext(version)
+    if platform == "osmesa":
+        return OSMesaContext(version)
+    raise ValueError(f"Unknown offscreen platform: {platform}")
+
+
+class PixelReader:
+    def __init__(self, size):
+        self._size = size
+        self._nbytes = size[0] * size[1] * 4
+        self._pbos = list(glGenBuffers(2))
+        for pbo in self._pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self._nbytes, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._pending = []
+        self._count = 0
+
+    def read(self):
+        # Starts reading the bound framebuffer into one buffer and returns the
+        # frame started in the previous call, which had a frame to complete
+        pbo = self._pbos[self._count % 2]
+        self._count += 1
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        width, height = self._size
+        glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._pending.append(pbo)
+
+        if len(self._pending) < 2:
+            return None
+        return self._map(self._pending.pop(0))
+
+    def flush(self):
+        if not self._pending:
+            return None
+        return self._map(self._pending.pop(0))
+
+    def close(self):
+        glDeleteBuffers(2, self._pbos)
+        self._pending = []
+
+    def _map(self, pbo):
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        address = glMapBufferRange(
+            GL_PIXEL_PACK_BUFFER, 0, self._nbytes, GL_MAP_READ_BIT
+        )
+        data = (ctypes.c_ubyte * self._nbytes).from_address(address)
+        width, height = self._size
+        frame = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 4)
+        frame = frame[::-1, :, :3].copy()
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return frame
+
+
+class OffscreenWindow(Window):
+    def __init__(self, config, seed, platform="egl", samples=4):
+        self._config = config
+        version = (4, 3) if config.shaders.explosion_stage == "compute" else (3, 3)
+        self._context = create_context(platform, version)
+        self._framebuffer = Framebuffer(config.window.size, samples)
+        self._pixels = PixelReader(config.window.size)
+
+        self._running = True
+        self._time = 0.0
+        self._seed = seed
+        self._stopped = False
+        # Frame times come from the caller, the clock is only ever reset
+        clock = config.clock
+        self._simulation_clock = SimulationClock(
+            clock.mode, clock.step, clock.max_delta, clock.interpolate
+        )
+        self._recorder = None
+        self._player = None
+        # Frames go to self._framebuffer at a fixed quality
+        self._render_target = None
+        # Milliseconds each frame of the last timed render() took
+        self.frame_ms = []
+
+        self._initalize_shader()
+        self._initialize_uniforms()
+        self._initialize_camera()
+        self._initialize_simulation_params()
+        self._initalize_objects()
+
+    def configure_simulation(self, simulation, seed):
+        self._config = replace(self._config, simulation=simulation)
+        self._seed = seed
+        self._initialize_simulation_params()
+        self._indicator_model_matrix = glm.translate(
+            glm.mat4(1.0), glm.vec3(*self._explosion_origin)
+        )
+        if self._instances is not None:
+            self._instances.reseed(seed)
+
+    def render(self, times, timed=False):
+        # Yields the frame for each time one step late, so reading it back
+        # overlaps with rendering the next one. With `timed` every frame is
+        # bounded by glFinish and its duration kept in frame_ms, which gives
+        # up that overlap but works on drivers without useful timer queries.
+        glEnable(GL_DEPTH_TEST)
+        glEnable(GL_CULL_FACE)
+        self.frame_ms = []
+        for time in times:
+            self._time = max(0.0, time * self._time_mult)
+
+            if self._profiler is not None:
+                self._profiler.begin_frame()
+
+            if timed:
+                glFinish()
+                start = perf_counter()
+            self._framebuffer.bind()
+            self._update()
+            self._framebuffer.resolve()
+            if timed:
+                glFinish()
+                self.frame_ms.append((perf_counter() - start) * 1000)
+
+            with self._phase("readback"):
+                frame = self._pixels.read()
+            if self._profiler is not None:
+                self._profiler.end_frame()
+            if frame is not None:
+                yield frame
+
+        frame = self._pixels.flush()
+        if frame is not None:
+            yield frame
+
+    def close(self):
+        self._cleanup()
+        self._pixels.close()
+        self._framebuffer.close()
+        self._context.close()
@@ -0,0 +1,160 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+
+PACING_MODES = ("capped", "vsync", "uncapped")
+# Sleeping is only accurate to about a millisecond, the rest is spun
+_SPIN_SECONDS = 0.002
+
+
+class FramePacer:
+    # capped: frames start 1/fps apart, measured against a running deadline so
+    # that sleep inaccuracy does not add up
+    # vsync: buffer swaps wait for the display. Every frame starts as late as it
+    # can and still be presented at the next refresh, which keeps the input it
+    # samples fresh. The refresh period is measured from the swaps.
+    # uncapped: no waiting, for benchmarking
+    def __init__(self, mode, fps, margin=0.002, smoothing=0.1):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode: {mode}")
+
+        self._mode = mode
+        self._period = 1 / fps
+        self._margin = margin
+        self._smoothing = smoothing
+        self._intervals = deque(maxlen=30)
+        self._work_time = None
+        self._last_work_time = 0.0
+        self._deadline = None
+        self._frame_start = None
+        self._last_present = None
+
+    @property
+    def work_time(self):
+        # Smoothed seconds from the start of a frame until its buffers were
+        # swapped, without the time the swap blocks for vsync
+        return self._work_time or 0.0
+
+    @property
+    def last_work_time(self):
+        return self._last_work_time
+
+    @property
+    def period(self):
+        if self._mode == "vsync" and self._intervals:
+            # The median ignores refreshes that were missed
+            return sorted(self._intervals)[len(self._intervals) // 2]
+        return self._period
+
+    def wait(self):
+        # Waits until the next frame should start and returns the seconds since
+        # the previous one started
+        if self._mode == "capped" and self._deadline is not None:
+            _sleep_until(self._deadline)
+        elif self._mode == "vsync" and self._last_present is not None:
+            _sleep_until(
+                self._last_present + self.period - self.work_time - self._margin
+            )
+
+        now = time.perf_counter()
+        delta = 0.0 if self._frame_start is None else now - self._frame_start
+        self._frame_start = now
+
+        if self._mode == "capped":
+            # A frame that is more than a period late starts a new schedule
+            if self._deadline is None or now - self._deadline > self._period:
+                self._deadline = now
+            self._deadline += self._period
+
+        return delta
+
+    def submitted(self):
+        # Called just before the buffer swap
+        if self._frame_start is None:
+            raise RuntimeError("submitted() called before wait()")
+
+        work_time = time.perf_counter() - self._frame_start
+        self._last_work_time = work_time
+        if self._work_time is None:
+            self._work_time = work_time
+        else:
+            self._work_time += (work_time - self._work_time) * self._smoothing
+
+    def presented(self):
+        # Called just after the buffer swap
+        if self._frame_start is None:
+            raise RuntimeError("presented() called before wait()")
+
+        now = time.perf_counter()
+        if self._last_present is not None:
+            self._intervals.append(now - self._last_present)
+        self._last_present = now
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    subdivision: int
+    samples: int
+    scale: float
+
+
+def quality_levels(subdivision, samples, min_scale, scale_step=0.75):
+    # From best to worst: subdivision goes first since it costs the most,
+    # then MSAA samples, then render resolution
+    levels = [QualityLevel(subdivision, samples, 1.0)]
+    while subdivision > 1:
+        subdivision -= 1
+        levels.append(QualityLevel(subdivision, samples, 1.0))
+    while samples > 1:
+        samples //= 2
+        levels.append(QualityLevel(subdivision, samples, 1.0))
+    scale = 1.0
+    while scale * scale_step >= min_scale:
+        scale *= scale_step
+        levels.append(QualityLevel(subdivision, samples, scale))
+    return levels
+
+
+class QualityGovernor:
+    # Steps down one level after `patience` frames over the budget and back up
+    # after `recovery` frames below headroom * budget. The recovery is much
+    # slower so that the quality does not oscillate around the budget.
+    def __init__(self, levels, budget, patience=10, recovery=120, headroom=0.7):
+        self._levels = levels
+        self._budget = budget
+        self._patience = patience
+        self._recovery = recovery
+        self._headroom = headroom
+        self._index = 0
+        self._over = 0
+        self._under = 0
+
+    @property
+    def level(self):
+        return self._levels[self._index]
+
+    def update(self, frame_time):
+        # Returns True when the level changed
+        self._over = self._over + 1 if frame_time > self._budget else 0
+        self._under = (
+            self._under + 1 if frame_time < self._budget * self._headroom else 0
+        )
+
+        if self._over >= self._patience and self._index < len(self._levels) - 1:
+            self._index += 1
+        elif self._under >= self._recovery and self._index > 0:
+            self._index -= 1
+        else:
+            return False
+
+        self._over = 0
+        self._under = 0
+        return True
+
+
+def _sleep_until(deadline):
+    remaining = deadline - time.perf_counter()
+    if remaining > _SPIN_SECONDS:
+        time.sleep(remaining - _SPIN_SECONDS)
+    while time.perf_counter() < deadline:
+        pass
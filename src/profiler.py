@@ -0,0 +1,153 @@
+import ctypes
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from OpenGL.GL import *
+
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    # CPU time of each phase comes from perf_counter_ns, GPU time from a pair
+    # of timestamp queries around it. Query results are collected once the
+    # GPU has finished the frame, usually a frame or two later, so reading
+    # them never stalls the pipeline.
+    def __init__(self, history=600, trace_path=None):
+        self._history = history
+        self._cpu_ms = {}
+        self._gpu_ms = {}
+        self._free_queries = []
+        self._pending = deque()
+        self._phases = []
+        self._frame = None
+
+        self._trace = None
+        if trace_path:
+            # Chrome's JSON array format, which may be left without the closing
+            # bracket if the program dies
+            trace = self._trace = open(trace_path, "w")
+            trace.write("[")
+            self._separator = "\n"
+            for tid, thread in ((1, "CPU"), (2, "GPU")):
+                self._write_event(
+                    trace,
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "tid": tid,
+                        "args": {"name": thread},
+                    },
+                )
+
+        # Moves GPU timestamps onto the perf_counter_ns clock for the trace
+        gpu_time = GLint64(0)
+        glGetInteger64v(GL_TIMESTAMP, ctypes.byref(gpu_time))
+        self._gpu_offset = time.perf_counter_ns() - gpu_time.value
+
+    @property
+    def phases(self):
+        return list(self._cpu_ms)
+
+    def begin_frame(self):
+        self._phases = []
+        self._frame = self._begin("frame")
+
+    def end_frame(self):
+        self._end(self._frame)
+        self._pending.append(self._phases)
+        self._phases = []
+        self._collect()
+
+    @contextmanager
+    def phase(self, name):
+        token = self._begin(name)
+        try:
+            yield
+        finally:
+            self._end(token)
+
+    def percentiles(self, name="frame", gpu=False):
+        # (p50, p95, p99) in milliseconds, None before the first sample
+        samples = (self._gpu_ms if gpu else self._cpu_ms).get(name)
+        if not samples:
+            return None
+        return tuple(float(value) for value in np.percentile(samples, PERCENTILES))
+
+    def close(self):
+        if self._pending:
+            glFinish()
+            self._collect()
+        if self._free_queries:
+            glDeleteQueries(len(self._free_queries), self._free_queries)
+            self._free_queries = []
+        if self._trace is not None:
+            self._trace.write("\n]\n")
+            self._trace.close()
+            self._trace = None
+
+    def _begin(self, name):
+        queries = self._query_pair()
+        glQueryCounter(queries[0], GL_TIMESTAMP)
+        return name, time.perf_counter_ns(), queries
+
+    def _end(self, token):
+        name, start, queries = token
+        end = time.perf_counter_ns()
+        glQueryCounter(queries[1], GL_TIMESTAMP)
+        self._phases.append((name, queries))
+        self._add_sample(self._cpu_ms, name, (end - start) / 1e6)
+        self._trace_event(name, 1, start, end)
+
+    def _collect(self):
+        # Queries finish in order, so a frame is done once its last one is
+        while self._pending:
+            phases = self._pending[0]
+            _, (_, last) = phases[-1]
+            if not glGetQueryObjectuiv(last, GL_QUERY_RESULT_AVAILABLE):
+                return
+            self._pending.popleft()
+
+            for name, queries in phases:
+                start, end = _query_result(queries[0]), _query_result(queries[1])
+                self._add_sample(self._gpu_ms, name, (end - start) / 1e6)
+                self._trace_event(
+                    name, 2, start + self._gpu_offset, end + self._gpu_offset
+                )
+                self._free_queries.extend(queries)
+
+    def _query_pair(self):
+        if len(self._free_queries) < 2:
+            self._free_queries.extend(glGenQueries(16))
+        return self._free_queries.pop(), self._free_queries.pop()
+
+    def _add_sample(self, samples, name, ms):
+        if name not in samples:
+            samples[name] = deque(maxlen=self._history)
+        samples[name].append(ms)
+
+    def _trace_event(self, name, tid, start, end):
+        if self._trace is not None:
+            self._write_event(
+                self._trace,
+                {
+                    "name": name,
+                    "ph": "X",
+                    "tid": tid,
+                    "ts": start / 1000,
+                    "dur": (end - start) / 1000,
+                },
+            )
+
+    def _write_event(self, trace, event):
+        trace.write(self._separator + json.dumps({"pid": 1, **event}))
+        self._separator = ",\n"
+
+
+def _query_result(query):
+    # PyOpenGL has no output array type for 64 bit integers
+    result = GLuint64(0)
+    glGetQueryObjectui64v(query, GL_QUERY_RESULT, ctypes.byref(result))
+    return result.value
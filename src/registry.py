@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event
+
+from loader import Mesh, ObjectLoader
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        budget_bytes,
+        cache=None,
+        chunk_bytes=16 * 1024 * 1024,
+        compact=False,
+        parse_chunk_bytes=None,
+        keep_vertices=True,
+        grid=False,
+    ):
+        self._budget_bytes = budget_bytes
+        self._cache = cache
+        self._chunk_bytes = chunk_bytes
+        self._compact = compact
+        self._parse_chunk_bytes = parse_chunk_bytes
+        self._keep_vertices = keep_vertices
+        self._grid = grid
+        self._models = OrderedDict()
+        self._active = None
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._loading = None
+        self._error = None
+        self._failed = None
+
+    @property
+    def nbytes(self):
+        return sum(model.nbytes for model in self._models.values())
+
+    @property
+    def loading(self):
+        if self._loading is None:
+            return None
+        if self._loading.model is None:
+            return "Parsing", 0.0
+        return "Uploading", self._loading.model.progress
+
+    @property
+    def error(self):
+        return self._error
+
+    def get(self, filepath, format):
+        key = self._key(filepath, format)
+        if key not in self._models:
+            self._insert(key, self._loader(self.parse(filepath, format)))
+
+        return self._use(key)
+
+    def request(self, filepath, format):
+        key = self._checked_key(filepath, format)
+        # A model that failed to load is not parsed again until it changes
+        if key is None or key == self._failed:
+            return None
+
+        self._submit(key, filepath, format)
+        if key not in self._models:
+            return None
+
+        return self._use(key)
+
+    def prefetch(self, filepath, format):
+        key = self._checked_key(filepath, format)
+        if key is not None:
+            self._submit(key, filepath, format)
+        return key
+
+    def parse(self, filepath, format, cancelled=None):
+        # Mesh with the cache and options of the registry, not managed by it
+        return Mesh(
+            filepath,
+            format,
+            self._cache,
+            self._compact,
+            self._parse_chunk_bytes,
+            cancelled,
+            self._grid,
+        )
+
+    def load_mesh(self, filepath, format):
+        # Future of a mesh the registry does not manage, parsed after the models
+        # already queued
+        return self._executor.submit(self.parse, filepath, format)
+
+    def update(self):
+        # Finishes background loads on the GL thread, one upload chunk per call
+        loading = self._loading
+        if loading is None:
+            return
+
+        model = loading.model
+        if model is None:
+            if not loading.future.done():
+                return
+
+            try:
+                mesh = loading.future.result()
+            except Exception as e:
+                self._error = f"{loading.key[0]}: {e}"
+                self._failed = loading.key
+                self._loading = None
+                return
+
+            model = loading.model = self._loader(mesh, self._chunk_bytes)
+
+        if model.upload(self._chunk_bytes):
+            self._insert(loading.key, model)
+            self._loading = None
+
+    def close(self):
+        self._cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+        for model in self._models.values():
+            model.close()
+        self._models.clear()
+
+    def _key(self, filepath, format):
+        path = Path(filepath).resolve()
+        return str(path), format, path.stat().st_mtime_ns
+
+    def _checked_key(self, filepath, format):
+        try:
+            return self._key(filepath, format)
+        except OSError as e:
+            self._error = str(e)
+            return None
+
+    def _submit(self, key, filepath, format):
+        if key in self._models:
+            return
+        if self._loading is not None and self._loading.key == key:
+            return
+
+        self._cancel()
+        self._error = None
+        self._failed = None
+        cancelled = Event()
+        future = self._executor.submit(self.parse, filepath, format, cancelled)
+        self._loading = _Loading(key, future, cancelled)
+
+    def _loader(self, mesh, chunk_bytes=None):
+        return ObjectLoader(mesh, chunk_bytes, self._keep_vertices)
+
+    def _use(self, key):
+        self._active = key
+        self._models.move_to_end(key)
+        return self._models[key]
+
+    def _insert(self, key, model):
+        path, format, _ = key
+        for stale in [k for k in self._models if k[:2] == (path, format)]:
+            if stale != self._active:
+                self._models.pop(stale).close()
+
+        self._models[key] = model
+        self._evict()
+
+    def _cancel(self):
+        if self._loading is None:
+            return
+
+        # A parse that already started stops at its next chunk
+        self._loading.future.cancel()
+        self._loading.cancelled.set()
+        if self._loading.model is not None:
+            self._loading.model.close()
+        self._loading = None
+
+    def _evict(self):
+        # The newest model and the one being rendered are never evicted
+        newest = next(reversed(self._models))
+        for key in list(self._models):
+            if self.nbytes <= self._budget_bytes:
+                break
+            if key not in (newest, self._active):
+                self._models.pop(key).close()
+
+
+class _Loading:
+    def __init__(self, key, future, cancelled):
+        self.key = key
+        self.future = future
+        self.cancelled = cancelled
+        self.model: ObjectLoader | None = None
@@ -1,53 +1,228 @@
-import math
+import functools
+
 from OpenGL.GL import *
+from OpenGL.GL.ARB.parallel_shader_compile import (
+    GL_COMPLETION_STATUS_ARB,
+    glInitParallelShaderCompileARB,
+)
 
+from uniforms import BLOCK_BINDINGS
 
-class Shader:
-    def __init__(self, vertex_path, geometry_path, fragment_path):
-        vertex = self._complie_shader(vertex_path, GL_VERTEX_SHADER)
-        geometry = self._complie_shader(geometry_path, GL_GEOMETRY_SHADER)
-        fragment = self._complie_shader(fragment_path, GL_FRAGMENT_SHADER)
 
-        self._program = self._create_shader_program(vertex, geometry, fragment)
+class Shader:
+    def __init__(
+        self,
+        vertex_path,
+        geometry_path,
+        fragment_path,
+        defines=None,
+        feedback_varyings=None,
+        cache=None,
+    ):
+        stages = [
+            (vertex_path, GL_VERTEX_SHADER),
+            (geometry_path, GL_GEOMETRY_SHADER),
+            (fragment_path, GL_FRAGMENT_SHADER),
+        ]
+        self._build(stages, defines, feedback_varyings, cache)
 
     @property
     def program(self):
         return self._program
 
-    def _complie_shader(self, path, shader_type):
-        if path is None:
-            return None
+    @property
+    def defines(self):
+        return self._defines
+
+    @property
+    def paths(self):
+        return [path for path, _ in self._stages if path is not None]
+
+    def location(self, name):
+        return self._locations.get(name, -1)
+
+    def reload(self):
+        # Starts building the program from the current sources next to the one
+        # in use, swap() puts it in place once it is done
+        if self._pending is not None:
+            self._discard(self._pending)
+            self._pending = None
+        self._pending = self._start_build()
+
+    def swap(self):
+        # Returns True when the reloaded program replaced the running one and
+        # False while there is none or it is still compiling. A failed build
+        # raises RuntimeError and the running program stays.
+        if self._pending is None or not self._pending.done():
+            return False
+
+        pending, self._pending = self._pending, None
+        program = self._finish_build(pending)
+        glDeleteProgram(self._program)
+        self._use_program(program)
+        return True
+
+    def _build(self, stages, defines, feedback_varyings, cache):
+        self._defines = dict(defines or {})
+        self._feedback_varyings = feedback_varyings
+        self._stages = stages
+        self._cache = cache
+        self._pending = None
+
+        self._use_program(self._finish_build(self._start_build()))
+
+    def _use_program(self, program):
+        self._program = program
+        self._locations = self._introspect_uniforms()
+        self._bind_uniform_blocks()
+
+    def _start_build(self):
+        sources = [
+            (self._apply_defines(load_file(path)), shader_type)
+            for path, shader_type in self._stages
+            if path is not None
+        ]
+
+        key = None
+        if self._cache is not None:
+            key = self._cache.key(sources, self._feedback_varyings)
+            binary = self._cache.load(key)
+            if binary is not None:
+                program = glCreateProgram()
+                glProgramBinary(program, binary[0], binary[1], len(binary[1]))
+                # A binary of another driver version fails to link
+                if glGetProgramiv(program, GL_LINK_STATUS):
+                    return _Build(program, [], None)
+                glDeleteProgram(program)
+
+        # With parallel shader compilation the driver compiles and links on its
+        # own threads and the status checks in _finish_build wait for it
+        shaders = [self._complie_shader(*source) for source in sources]
+        return _Build(self._create_shader_program(*shaders), shaders, key)
+
+    def _finish_build(self, build):
+        try:
+            for shader in build.shaders:
+                if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+                    error = glGetShaderInfoLog(shader).decode()
+                    raise RuntimeError(f"Shader compilation failed: {error}")
+
+            if not glGetProgramiv(build.program, GL_LINK_STATUS):
+                error = glGetProgramInfoLog(build.program).decode()
+                raise RuntimeError(f"Program linking failed: {error}")
+        except RuntimeError:
+            self._discard(build)
+            raise
+
+        for shader in build.shaders:
+            glDeleteShader(shader)
+        if self._cache is not None and build.key is not None:
+            self._cache.store(build.key, *_program_binary(build.program))
 
-        file_content = load_file(path)
+        return build.program
+
+    def _discard(self, build):
+        for shader in build.shaders:
+            glDeleteShader(shader)
+        glDeleteProgram(build.program)
+
+    def _complie_shader(self, source, shader_type):
         shader = glCreateShader(shader_type)
-        glShaderSource(shader, file_content)
+        glShaderSource(shader, source)
         glCompileShader(shader)
+        return shader
 
-        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
-            error = glGetShaderInfoLog(shader).decode()
-            raise RuntimeError(f"Shader compilation failed: {error}")
+    def _apply_defines(self, source):
+        if not self._defines:
+            return source
 
-        return shader
+        # Defines have to follow the #version directive
+        version, _, body = source.partition("\n")
+        defines = "".join(f"#define {k} {v}\n" for k, v in self._defines.items())
+        return f"{version}\n{defines}{body}"
 
-    def _create_shader_program(self, vertex, geometry, fragment):
+    def _create_shader_program(self, *shaders):
         program = glCreateProgram()
-        glAttachShader(program, vertex)
-        if geometry is not None:
-            glAttachShader(program, geometry)
-        glAttachShader(program, fragment)
+        for shader in shaders:
+            glAttachShader(program, shader)
+
+        if self._feedback_varyings:
+            names = [name.encode() for name in self._feedback_varyings]
+            glTransformFeedbackVaryings(
+                program,
+                len(names),
+                ctypes.cast(
+                    (ctypes.c_char_p * len(names))(*names),
+                    ctypes.POINTER(ctypes.POINTER(GLchar)),
+                ),
+                GL_INTERLEAVED_ATTRIBS,
+            )
 
+        if self._cache is not None:
+            glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
         glLinkProgram(program)
+        return program
 
-        if not glGetProgramiv(program, GL_LINK_STATUS):
-            error = glGetProgramInfoLog(program).decode()
-            raise RuntimeError(f"Program linking failed: {error}")
+    def _introspect_uniforms(self):
+        locations = {}
+        for i in range(glGetProgramiv(self._program, GL_ACTIVE_UNIFORMS)):
+            name, _, _ = glGetActiveUniform(self._program, i)
+            name = name.decode()
+            location = glGetUniformLocation(self._program, name)
+            if location < 0:
+                continue
 
-        glDeleteShader(vertex)
-        if geometry is not None:
-            glDeleteShader(geometry)
-        glDeleteShader(fragment)
+            locations[name] = location
+            if name.endswith("[0]"):
+                locations[name[:-3]] = location
 
-        return program
+        return locations
+
+    def _bind_uniform_blocks(self):
+        for name, binding in BLOCK_BINDINGS.items():
+            index = glGetUniformBlockIndex(self._program, name)
+            if index != GL_INVALID_INDEX:
+                glUniformBlockBinding(self._program, index, binding)
+
+
+class ComputeShader(Shader):
+    def __init__(self, compute_path, defines=None, cache=None):
+        version = glGetIntegerv(GL_MAJOR_VERSION), glGetIntegerv(GL_MINOR_VERSION)
+        if version < (4, 3):
+            raise RuntimeError("Compute shaders require OpenGL 4.3")
+
+        self._build([(compute_path, GL_COMPUTE_SHADER)], defines, None, cache)
+
+
+class _Build:
+    def __init__(self, program, shaders, key):
+        self.program = program
+        self.shaders = shaders
+        self.key = key
+
+    def done(self):
+        if not _parallel_compile():
+            return True
+        # PyOpenGL does not know the output size of this query
+        status = GLint(0)
+        glGetProgramiv(self.program, GL_COMPLETION_STATUS_ARB, ctypes.byref(status))
+        return bool(status.value)
+
+
+@functools.cache
+def _parallel_compile():
+    return bool(glInitParallelShaderCompileARB())
+
+
+def _program_binary(program):
+    length = glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH)
+    data = (ctypes.c_ubyte * length)()
+    written = GLsizei(0)
+    binary_format = GLenum(0)
+    glGetProgramBinary(
+        program, length, ctypes.byref(written), ctypes.byref(binary_format), data
+    )
+    return binary_format.value, bytes(data[: written.value])
 
 
 def load_file(path):
@@ -0,0 +1,151 @@
+import numpy as np
+
+# Runs are (firsts, counts) arrays of sorted, disjoint vertex ranges, the same
+# form ClusterBounds.runs() returns for glMultiDrawArrays.
+
+
+class TriangleGrid:
+    # Uniform grid over the triangle centroids. Triangle ids are stored sorted
+    # by cell, so a query only reads the cells around the query points and
+    # costs as much as the triangles it finds, not the whole mesh.
+    def __init__(self, positions, triangles_per_cell=32):
+        # positions: (n_vertices, 3) in model space, three corners per triangle
+        corners = np.asarray(positions, dtype=np.float32).reshape(-1, 3, 3)
+        self.centroids = (corners[:, 0] + corners[:, 1] + corners[:, 2]) / 3
+        self.radii = np.linalg.norm(corners - self.centroids[:, None], axis=2).max(
+            axis=1, initial=0.0
+        )
+        self._max_radius = float(self.radii.max(initial=0.0))
+
+        count = len(self.centroids)
+        self._minimum = self.centroids.min(axis=0, initial=np.inf)
+        extent = self.centroids.max(axis=0, initial=-np.inf) - self._minimum
+        if count == 0:
+            self._minimum = np.zeros(3, dtype=np.float32)
+            extent = np.zeros(3)
+        extent = np.maximum(extent, 1e-6 * max(extent.max(), 1.0))
+
+        # Cubic cells holding triangles_per_cell on average, grown until flat
+        # meshes do not end up with far more cells than triangles
+        target = max(count // triangles_per_cell, 1)
+        self._cell_size = float(np.cbrt(np.prod(extent) / target))
+        while np.prod(self._grid_shape(extent), dtype=np.float64) > 8 * target:
+            self._cell_size *= 1.25
+        self._shape = self._grid_shape(extent)
+
+        cells = self._flat(self._cell_coords(self.centroids))
+        self._order = np.argsort(cells, kind="stable").astype(np.int32)
+        n_cells = int(np.prod(self._shape))
+        self._starts = np.concatenate(
+            ([0], np.cumsum(np.bincount(cells, minlength=n_cells)))
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        # Grid saved with arrays(), without sorting the triangles again
+        grid = cls.__new__(cls)
+        grid.centroids = arrays["centroids"]
+        grid.radii = arrays["radii"]
+        grid._max_radius = float(arrays["max_radius"])
+        grid._minimum = arrays["minimum"]
+        grid._cell_size = float(arrays["cell_size"])
+        grid._shape = arrays["shape"]
+        grid._order = arrays["order"]
+        grid._starts = arrays["starts"]
+        return grid
+
+    def arrays(self):
+        return {
+            "centroids": self.centroids,
+            "radii": self.radii,
+            "max_radius": np.float64(self._max_radius),
+            "minimum": self._minimum,
+            "cell_size": np.float64(self._cell_size),
+            "shape": self._shape,
+            "order": self._order,
+            "starts": self._starts,
+        }
+
+    def __len__(self):
+        return len(self.centroids)
+
+    def query(self, centers, reach, radius_scale=1.0):
+        # Sorted ids of the triangles whose bounding sphere, grown by
+        # radius_scale, comes closer than `reach` to any of the centers
+        found = []
+        margin = reach + self._max_radius * radius_scale
+        for center in np.asarray(centers, dtype=np.float32).reshape(-1, 3):
+            low = self._cell_coords((center - margin)[None])[0]
+            high = self._cell_coords((center + margin)[None])[0]
+            axes = [np.arange(lo, hi + 1) for lo, hi in zip(low, high)]
+            cells = self._flat(np.stack(np.meshgrid(*axes, indexing="ij"), -1))
+            cells = cells.ravel()
+
+            starts = self._starts[cells]
+            counts = self._starts[cells + 1] - starts
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+            candidates = self._order[offsets + np.arange(counts.sum())]
+
+            distances = np.linalg.norm(self.centroids[candidates] - center, axis=1)
+            near = distances - self.radii[candidates] * radius_scale < reach
+            found.append(candidates[near])
+
+        if not found:
+            return np.zeros(0, dtype=np.int32)
+        return np.unique(np.concatenate(found))
+
+    def _grid_shape(self, extent):
+        return np.maximum(np.ceil(extent / self._cell_size), 1).astype(np.int64)
+
+    def _cell_coords(self, points):
+        coords = np.floor((points - self._minimum) / self._cell_size)
+        return np.clip(coords, 0, self._shape - 1).astype(np.int64)
+
+    def _flat(self, coords):
+        x, y, z = np.moveaxis(coords, -1, 0)
+        return (x * self._shape[1] + y) * self._shape[2] + z
+
+
+def triangle_runs(ids):
+    # Vertex runs of sorted triangle ids, consecutive triangles merged
+    if len(ids) == 0:
+        return np.zeros(0, np.int32), np.zeros(0, np.int32)
+    breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(ids)]))
+    return (ids[starts] * 3).astype(np.int32), ((ends - starts) * 3).astype(np.int32)
+
+
+def clip_runs(runs, start, count):
+    # The parts of the runs within [start, start + count)
+    firsts, counts = runs
+    ends = firsts + counts
+    low = np.searchsorted(ends, start, side="right")
+    high = np.searchsorted(firsts, start + count, side="left")
+    clipped = np.maximum(firsts[low:high], start)
+    clipped_ends = np.minimum(ends[low:high], start + count)
+    return clipped.astype(np.int32), (clipped_ends - clipped).astype(np.int32)
+
+
+def complement_runs(runs, start, count):
+    # Ranges of [start, start + count) not covered by the runs
+    firsts, counts = clip_runs(runs, start, count)
+    gap_firsts = np.concatenate(([start], firsts + counts))
+    gap_ends = np.concatenate((firsts, [start + count]))
+    keep = gap_ends > gap_firsts
+    gap_firsts = gap_firsts[keep]
+    return gap_firsts.astype(np.int32), (gap_ends[keep] - gap_firsts).astype(np.int32)
+
+
+def intersect_runs(a, b):
+    # Overlap of two run lists, from the points where both are open
+    positions = np.concatenate((a[0], a[0] + a[1], b[0], b[0] + b[1]))
+    deltas = np.repeat([1, -1, 1, -1], [len(a[0]), len(a[0]), len(b[0]), len(b[0])])
+    # Runs are half-open, so closing comes before opening at the same position
+    order = np.lexsort((deltas, positions))
+    positions = positions[order]
+    both = np.flatnonzero(np.cumsum(deltas[order]) == 2)
+    firsts = positions[both]
+    counts = positions[both + 1] - firsts
+    keep = counts > 0
+    return firsts[keep].astype(np.int32), counts[keep].astype(np.int32)
@@ -0,0 +1,170 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+from pathlib import Path
+
+import numpy as np
+
+from config import Config, SimulationConfig
+from headless import select_platform, write_png
+
+# Offscreen window of the current worker process
+_window = None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    select_platform(args.platform)
+
+    config = Config.from_file(args.config)
+    with open(args.sweep, "rb") as fh:
+        sweep = tomllib.load(fh)["sweep"]
+
+    size = tuple(sweep.get("size", config.window.size))
+    config = replace(config, window=replace(config.window, size=size))
+    times = sweep["times"]
+    columns = sweep.get("columns", len(times))
+    seed = sweep.get("seed", 42.0)
+    variants = expand_variants(sweep)
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    warm_mesh_cache(config)
+
+    # Workers are spawned rather than forked so that none inherits GL state
+    executor = ProcessPoolExecutor(
+        args.workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_start_worker,
+        initargs=(config, args.platform, args.samples),
+    )
+    with executor:
+        futures = [
+            executor.submit(
+                _render_variant,
+                i,
+                config.simulation,
+                variant,
+                seed,
+                times,
+                columns,
+                output,
+            )
+            for i, variant in enumerate(variants)
+        ]
+        results = [future.result() for future in futures]
+
+    with open(output / "sweep.json", "w") as fh:
+        json.dump({"times": times, "variants": results}, fh, indent=2)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Render contact sheets for many explosion parameter sets"
+    )
+    parser.add_argument("sweep", type=Path, help="TOML file with a [sweep] table")
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=None,
+        help="parameter file, config.toml by default",
+    )
+    parser.add_argument("--output", default="sweep", help="output directory")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--samples", type=int, default=4, help="MSAA samples")
+    parser.add_argument("--platform", choices=["egl", "osmesa"], default="egl")
+    return parser.parse_args(argv)
+
+
+def expand_variants(sweep):
+    # Explicit variants first, then the cartesian product of the grid
+    variants = [dict(variant) for variant in sweep.get("variants", [])]
+    grid = sweep.get("grid", {})
+    if grid:
+        names = list(grid)
+        variants += [
+            dict(zip(names, values)) for values in itertools.product(*grid.values())
+        ]
+    if not variants:
+        variants = [{}]
+
+    allowed = {field.name for field in fields(SimulationConfig)} | {"seed"}
+    for variant in variants:
+        unknown = set(variant) - allowed
+        if unknown:
+            raise ValueError(f"Unknown simulation parameters: {sorted(unknown)}")
+
+    return variants
+
+
+def warm_mesh_cache(config):
+    # Workers then map the cached vertex arrays instead of each parsing the models
+    if not config.cache.enabled:
+        return
+
+    from cache import MeshCache
+    from loader import Mesh
+
+    cache = MeshCache(config.cache.directory)
+    grid = config.rendering.partition_explosion
+    Mesh(config.models.car, config.models.car_format, cache, grid=grid)
+    Mesh(config.models.indicator, config.models.indicator_format, cache)
+
+
+def contact_sheet(frames, columns):
+    height, width, channels = frames[0].shape
+    rows = -(-len(frames) // columns)
+    sheet = np.zeros((rows * height, columns * width, channels), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        row, column = divmod(i, columns)
+        sheet[
+            row * height : (row + 1) * height, column * width : (column + 1) * width
+        ] = frame
+    return sheet
+
+
+def _start_worker(config, platform, samples):
+    global _window
+    select_platform(platform)
+    from offscreen import OffscreenWindow
+
+    _window = OffscreenWindow(config, 42.0, platform, samples)
+
+
+def _render_variant(index, simulation, variant, seed, times, columns, output):
+    parameters = dict(variant)
+    seed = parameters.pop("seed", seed)
+    window = _window
+    if window is None:
+        raise RuntimeError("The worker was not started with _start_worker")
+    window.configure_simulation(replace(simulation, **parameters), seed)
+
+    start = time.perf_counter()
+    frames = list(window.render(times, timed=True))
+    total_ms = (time.perf_counter() - start) * 1000
+    frame_ms = window.frame_ms
+
+    path = Path(output) / f"variant_{index:04d}.png"
+    write_png(path, contact_sheet(frames, columns))
+
+    return {
+        "index": index,
+        "parameters": {**parameters, "seed": seed},
+        "contact_sheet": path.name,
+        "total_ms": total_ms,
+        "frame_ms": frame_ms,
+        "min_frame_ms": min(frame_ms),
+        "median_frame_ms": float(np.median(frame_ms)),
+        "p95_frame_ms": float(np.percentile(frame_ms, 95)),
+        "pid": os.getpid(),
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import json
+
+TIMELINE_VERSION = 1
+
+
+class TimelineRecorder:
+    # One JSON line per frame with the simulation time and camera, plus the
+    # explosion state whenever it differs from the previous frame
+    def __init__(self, path):
+        self._fh = open(path, "w")
+        self._fh.write(json.dumps({"version": TIMELINE_VERSION}) + "\n")
+        self._state = None
+
+    def record(self, time, camera, state):
+        frame = {"time": time, "camera": camera}
+        if state != self._state:
+            frame["state"] = state
+            self._state = state
+        self._fh.write(json.dumps(frame) + "\n")
+
+    def close(self):
+        self._fh.close()
+
+
+class TimelinePlayer:
+    def __init__(self, path):
+        with open(path, "r") as fh:
+            header = json.loads(fh.readline())
+            if header.get("version") != TIMELINE_VERSION:
+                raise ValueError(f"{path} has an unsupported timeline version")
+            self._frames = [json.loads(line) for line in fh if line.strip()]
+        self._index = 0
+
+    @property
+    def frame_count(self):
+        return len(self._frames)
+
+    def next_frame(self):
+        if self._index >= len(self._frames):
+            return None
+
+        frame = self._frames[self._index]
+        self._index += 1
+        return frame
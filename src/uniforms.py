@@ -0,0 +1,86 @@
+import numpy as np
+from OpenGL.GL import *
+
+BLOCK_BINDINGS = {"Camera": 0, "Simulation": 1, "Materials": 2}
+STORAGE_BINDINGS = {
+    "MeshVertices": 0,
+    "MeshMaterials": 1,
+    "Instances": 2,
+    "Exploded": 3,
+}
+
+CAMERA_FIELDS = [
+    ("projection_matrix", "mat4"),
+    ("view_matrix", "mat4"),
+    ("camera_position", "vec3"),
+]
+
+SIMULATION_FIELDS = [
+    ("explosion_origin", "vec3"),
+    ("time", "float"),
+    ("magnitude", "float"),
+    ("falloff_radius", "float"),
+    ("falloff_strength", "float"),
+    ("impulse_decay", "float"),
+    ("random_strength", "float"),
+    ("gravity_power", "float"),
+    ("seed", "float"),
+]
+
+# std140 (alignment, size) in bytes for the member types used by the shaders
+_STD140 = {
+    "int": (4, 4),
+    "float": (4, 4),
+    "vec3": (16, 12),
+    "vec4": (16, 16),
+    "mat4": (16, 64),
+}
+
+
+class UniformBuffer:
+    def __init__(self, name, fields):
+        self._binding = BLOCK_BINDINGS[name]
+        self._offsets = {}
+
+        offset = 0
+        for field, type in fields:
+            alignment, size = _STD140[type]
+            offset = -(-offset // alignment) * alignment
+            self._offsets[field] = (offset // 4, size // 4, type)
+            offset += size
+
+        self._data = np.zeros(-(-offset // 16) * 4, dtype=np.float32)
+        self._dirty = True
+
+        self._ubo = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self._ubo)
+        glBufferData(GL_UNIFORM_BUFFER, self._data.nbytes, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        glBindBufferBase(GL_UNIFORM_BUFFER, self._binding, self._ubo)
+
+    def set(self, field, value):
+        start, count, type = self._offsets[field]
+        if type == "mat4":
+            # glm matrices convert row by row, GL expects column-major order
+            value = np.asarray(value, dtype=np.float32).T
+        elif type == "int":
+            value = np.array([value], dtype=np.int32).view(np.float32)
+
+        value = np.asarray(value, dtype=np.float32).ravel()
+        if not np.array_equal(self._data[start : start + count], value):
+            self._data[start : start + count] = value
+            self._dirty = True
+
+    def upload(self):
+        if not self._dirty:
+            return
+
+        glBindBuffer(GL_UNIFORM_BUFFER, self._ubo)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, self._data.nbytes, self._data)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        self._dirty = False
+
+    def close(self):
+        if self._ubo is not None:
+            glDeleteBuffers(1, [self._ubo])
+        self._ubo = None
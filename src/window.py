@@ -1,7 +1,7 @@
 import random
 import sys
-import tkinter as tk
-from tkinter import filedialog
+import time
+from contextlib import nullcontext
 
 import imgui
 import imgui.integrations.pygame
@@ -10,35 +10,60 @@ from OpenGL.GL import *
 from pygame.event import Event
 from pyglm import glm
 
+from cache import MeshCache, ProgramCache
 from camera import Camera
+from capture import FEEDBACK_VARYINGS, ExplosionCapture
+from clock import SimulationClock
 from config import Config
-from loader import ObjectLoader
-from shaders import Shader
+from framebuffer import Framebuffer
+from glstats import GLCallCounter
+from hotreload import ShaderReloader
+from instances import InstanceBuffer
+from loader import MAX_BATCHED_MATERIALS, ObjectLoader
+from pacing import FramePacer, QualityGovernor, quality_levels
+from profiler import FrameProfiler
+from registry import ModelRegistry
+from shaders import ComputeShader, Shader
+from timeline import TimelinePlayer, TimelineRecorder
+from uniforms import CAMERA_FIELDS, SIMULATION_FIELDS, UniformBuffer
 
 
 class Window:
-    def __init__(self):
+    def __init__(self, start_time=None):
+        # Startup times are measured from start_time, by default from here
+        self._start_time = start_time or time.perf_counter()
+        self._startup_times = {}
         self._config = Config.from_file()
 
         pygame.init()
         display_flags = pygame.DOUBLEBUF | pygame.OPENGL
-        pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLEBUFFERS, 1)
-        pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLESAMPLES, 4)
+        # The quality governor renders into a framebuffer of its own, whose
+        # samples and size change at runtime
+        samples = self._config.window.samples
+        if samples > 1 and not self._config.pacing.governor:
+            pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLEBUFFERS, 1)
+            pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLESAMPLES, samples)
         pygame.display.gl_set_attribute(
             pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE
         )
         pygame.display.set_caption(self._config.window.title)
-        self._screen = pygame.display.set_mode(self._config.window.size, display_flags)
-        self._clock = pygame.time.Clock()
+        self._screen = pygame.display.set_mode(
+            self._config.window.size,
+            display_flags,
+            vsync=int(self._config.pacing.mode == "vsync"),
+        )
         self._running = True
         self._time = 0
         self._seed = random.random() * 100
         self._stopped = self._config.simulation.stopped
 
         self._initalize_shader()
+        self._initialize_uniforms()
         self._initialize_camera()
         self._initialize_simulation_params()
-        self._initalize_objects()
+        self._initialize_clock()
+        self._initalize_objects(deferred=True)
+        self._initialize_pacing()
         self._initialize_ui()
 
     def run(self):
@@ -46,31 +71,192 @@ class Window:
         glEnable(GL_CULL_FACE)
         pygame.event.set_grab(True)
         while self._running:
-            events = pygame.event.get()
-            mouse_rel = pygame.mouse.get_rel()
-
-            self._handle_input(events, mouse_rel)
-
-            self._delta_time = self._clock.get_time() / 1000
-            if not self._stopped:
-                self._time = max(0, self._time + self._delta_time * self._time_mult)
-
-            self._update()
-            self._render_ui()
-
-            pygame.display.flip()
-            self._clock.tick(self._config.window.fps)
+            # Waiting comes first so that input is sampled right before rendering
+            self._delta_time = self._pacer.wait()
+            if self._profiler is not None:
+                self._profiler.begin_frame()
+
+            with self._phase("input"):
+                events = pygame.event.get()
+                mouse_rel = pygame.mouse.get_rel()
+                self._handle_input(events, mouse_rel)
+            with self._phase("models"):
+                self._update_models()
+            if self._shader_reloader is not None:
+                self._reload_shaders(self._shader_reloader)
+
+            if self._player is not None:
+                # Recorded frames wait for the models they show
+                if self._awaited_model is None and self._indicator_mesh is None:
+                    self._replay_frame(self._player)
+            elif not self._stopped:
+                self._time = self._simulation_clock.advance(
+                    self._delta_time, self._time_mult
+                )
+
+            if self._recorder is not None:
+                self._recorder.record(
+                    self._time, self._camera.state, self._timeline_state()
+                )
+
+            with self._phase("update"):
+                if self._render_target is not None:
+                    self._render_target.bind()
+                self._update()
+                if self._render_target is not None:
+                    self._render_target.present(self._config.window.size)
+            with self._phase("ui"):
+                self._render_ui()
+            self._pacer.submitted()
+            with self._phase("flip"):
+                pygame.display.flip()
+            self._pacer.presented()
+            if len(self._startup_times) < 3:
+                self._report_startup()
+
+            if self._governor is not None:
+                if self._governor.update(self._pacer.last_work_time):
+                    self._apply_quality(self._governor.level)
+            if self._gl_calls is not None:
+                self._gl_calls.end_frame()
+            if self._profiler is not None:
+                self._profiler.end_frame()
 
         self._cleanup()
         pygame.quit()
         sys.exit()
 
     def _initalize_shader(self):
-        self._shader = Shader(
-            self._config.shaders.vertex,
-            self._config.shaders.geometry,
-            self._config.shaders.fragment,
-        )
+        shaders = self._config.shaders
+        stage = shaders.explosion_stage
+        if stage not in ("geometry", "vertex", "compute"):
+            raise ValueError(f"Unknown explosion stage: {stage}")
+
+        self._program_cache = None
+        if self._config.cache.enabled:
+            names = (GL_VENDOR, GL_RENDERER, GL_VERSION)
+            driver = " ".join((glGetString(name) or b"").decode() for name in names)
+            self._program_cache = ProgramCache(
+                self._config.cache.program_directory, driver
+            )
+
+        defines = {}
+        if self._config.rendering.batch_materials:
+            defines["BATCH_MATERIALS"] = 1
+            defines["MAX_MATERIALS"] = MAX_BATCHED_MATERIALS
+        if self._config.scene.instanced:
+            defines["INSTANCED"] = 1
+        elif self._config.rendering.bake_explosion and stage != "compute":
+            defines["BAKED_EXPLOSION"] = 1
+        if self._config.rendering.compact_vertices:
+            if stage != "geometry" or "BAKED_EXPLOSION" in defines:
+                raise ValueError(
+                    "Compact vertices require the geometry explosion stage "
+                    "without baking"
+                )
+            defines["COMPACT_VERTICES"] = 1
+
+        subdivision = self._config.rendering.subdivision
+        if subdivision > 1:
+            if stage != "geometry":
+                raise ValueError("Subdivision requires the geometry explosion stage")
+            if self._config.rendering.capture_explosion:
+                raise ValueError("Subdivided explosions cannot be captured")
+            defines.update(self._subdivision_defines(subdivision))
+
+        capture = self._config.rendering.capture_explosion and stage != "compute"
+        varyings = FEEDBACK_VARYINGS if capture else None
+        if stage == "vertex":
+            self._shader = Shader(
+                shaders.vertex_explosion,
+                None,
+                shaders.fragment,
+                {**defines, "VERTEX_EXPLOSION": 1},
+                varyings,
+                self._program_cache,
+            )
+        else:
+            self._shader = Shader(
+                shaders.vertex,
+                shaders.geometry,
+                shaders.fragment,
+                defines,
+                varyings,
+                self._program_cache,
+            )
+
+        # The compute stage writes into the capture buffer every time the
+        # explosion changes, the indicator is still drawn by the main shader
+        self._compute = None
+        if stage == "compute":
+            self._compute = ComputeShader(
+                shaders.compute_explosion, defines, self._program_cache
+            )
+
+        self._capture = None
+        replay_shader = None
+        if capture or self._compute is not None:
+            replay_shader = Shader(
+                shaders.replay,
+                None,
+                shaders.fragment,
+                defines,
+                cache=self._program_cache,
+            )
+            self._capture = ExplosionCapture(replay_shader)
+
+        self._shader_reloader = None
+        if shaders.hot_reload:
+            watched = [self._shader, self._compute, replay_shader]
+            self._shader_reloader = ShaderReloader(
+                [shader for shader in watched if shader is not None]
+            )
+
+        if self._config.rendering.culling and (
+            self._capture is not None or self._config.scene.instanced
+        ):
+            raise ValueError("Culling works neither with capture nor with instancing")
+        if self._config.rendering.partition_explosion and (
+            stage != "geometry"
+            or self._capture is not None
+            or self._config.scene.instanced
+        ):
+            raise ValueError(
+                "Partitioning requires the geometry explosion stage without "
+                "capture or instancing"
+            )
+
+    def _subdivision_defines(self, subdivision):
+        # gl_Position, position, normal and material of every emitted vertex
+        max_vertices = subdivision * subdivision * 3
+        components = max_vertices * (4 + 3 + 3 + 1)
+        if max_vertices > glGetIntegerv(
+            GL_MAX_GEOMETRY_OUTPUT_VERTICES
+        ) or components > glGetIntegerv(GL_MAX_GEOMETRY_TOTAL_OUTPUT_COMPONENTS):
+            raise ValueError(
+                f"Subdivision {subdivision} exceeds the geometry shader output limits"
+            )
+
+        return {
+            "SUBDIVISION": subdivision,
+            "MAX_VERTICES": max_vertices,
+            "LOD_DISTANCE": float(self._config.rendering.lod_distance),
+        }
+
+    def _initialize_uniforms(self):
+        self._camera_uniforms = UniformBuffer("Camera", CAMERA_FIELDS)
+        self._simulation_uniforms = UniformBuffer("Simulation", SIMULATION_FIELDS)
+
+        self._gl_calls = None
+        if self._config.debug.count_gl_calls:
+            self._gl_calls = GLCallCounter()
+
+        self._profiler = None
+        if self._config.debug.profile:
+            self._profiler = FrameProfiler(
+                self._config.debug.profile_history,
+                self._config.debug.profile_trace or None,
+            )
 
     def _initialize_camera(self):
         self._camera = Camera(
@@ -100,19 +286,95 @@ class Window:
         self._new_model_path = self._config.models.car
         self._new_model_format = self._config.models.car_format
 
-    def _initalize_objects(self):
-        self._model = ObjectLoader(
-            self._config.models.car, self._config.models.car_format
+    def _initialize_clock(self):
+        clock = self._config.clock
+        self._simulation_clock = SimulationClock(
+            clock.mode, clock.step, clock.max_delta, clock.interpolate
         )
-        self._model_matrix = glm.mat4(1.0)
 
-        self._indicator = ObjectLoader(
-            self._config.models.indicator, self._config.models.indicator_format
+        self._recorder = None
+        if clock.record:
+            self._recorder = TimelineRecorder(clock.record)
+
+        self._player = None
+        if clock.replay:
+            self._player = TimelinePlayer(clock.replay)
+
+    def _initalize_objects(self, deferred=False):
+        # Deferred models are parsed in the background and uploaded in chunks
+        # while the first frames are already presented
+        self._mesh_cache = None
+        if self._config.cache.enabled:
+            self._mesh_cache = MeshCache(self._config.cache.directory)
+
+        self._models = ModelRegistry(
+            self._config.cache.gpu_budget_mb * 1024 * 1024,
+            self._mesh_cache,
+            self._config.cache.upload_chunk_mb * 1024 * 1024,
+            self._config.rendering.compact_vertices,
+            self._config.models.stream_chunk_mb * 1024 * 1024,
+            keep_vertices=(
+                "BAKED_EXPLOSION" in self._shader.defines
+                or self._config.rendering.culling
+            ),
+            grid=self._config.rendering.partition_explosion,
         )
+        car = (self._config.models.car, self._config.models.car_format)
+        indicator = (
+            self._config.models.indicator,
+            self._config.models.indicator_format,
+        )
+        self._model_matrix = glm.mat4(1.0)
+        self._model_source = car
+        if deferred:
+            self._model = None
+            self._awaited_model = car
+            self._models.prefetch(*car)
+            self._indicator = None
+            self._indicator_mesh = self._models.load_mesh(*indicator)
+        else:
+            self._model = self._models.get(*car)
+            self._awaited_model = None
+            self._indicator = ObjectLoader(
+                self._models.parse(*indicator), keep_vertices=False
+            )
+            self._indicator_mesh = None
+        self._indicator_error = None
         self._indicator_model_matrix = glm.translate(
             glm.mat4(1.0), glm.vec3(*self._explosion_origin)
         )
 
+        self._instances = None
+        if self._config.scene.instanced:
+            self._instances = InstanceBuffer.from_config(self._config.scene, self._seed)
+            InstanceBuffer.set_defaults()
+
+    def _initialize_pacing(self):
+        pacing = self._config.pacing
+        self._pacer = FramePacer(pacing.mode, self._config.window.fps)
+
+        self._governor = None
+        self._render_target = None
+        if pacing.governor:
+            levels = quality_levels(
+                self._config.rendering.subdivision,
+                self._config.window.samples,
+                pacing.min_scale,
+            )
+            budget = pacing.budget_ms / 1000 or 1 / self._config.window.fps
+            self._governor = QualityGovernor(levels, budget)
+            self._apply_quality(self._governor.level)
+
+    def _apply_quality(self, level):
+        if self._render_target is not None:
+            self._render_target.close()
+        size = [max(1, round(side * level.scale)) for side in self._config.window.size]
+        self._render_target = Framebuffer(size, level.samples)
+
+        # Caps the subdivision compiled into the geometry shader
+        glUseProgram(self._shader.program)
+        glUniform1i(self._shader.location("max_subdivision"), level.subdivision)
+
     def _initialize_ui(self):
         imgui.create_context()
         imgui.get_io().display_size = self._config.window.size
@@ -120,7 +382,7 @@ class Window:
         self._ui_renderer = imgui.integrations.pygame.PygameRenderer()
 
     def _reset_simulation(self):
-        self._time = 0
+        self._reset_time()
         self._magnitude = self._new_magnitude
         self._falloff_strength = self._new_falloff_strength
         self._falloff_radius = self._new_falloff_radius
@@ -128,15 +390,108 @@ class Window:
         self._impulse_decay = self._new_impulse_decay
         self._gravity_power = self._new_gravity_power
 
+        self._explosion_origin = self._new_explosion_origin
         self._indicator_model_matrix = glm.translate(
-            self._indicator_model_matrix,
-            glm.vec3(self._new_explosion_origin) - glm.vec3(self._explosion_origin),
+            glm.mat4(1.0), glm.vec3(*self._explosion_origin)
         )
 
-        self._explosion_origin = self._new_explosion_origin
+        self._awaited_model = (self._new_model_path, self._new_model_format)
+        self._update_models()
+
+    def _update_models(self):
+        self._models.update()
+        if self._indicator_mesh is not None and self._indicator_mesh.done():
+            try:
+                mesh = self._indicator_mesh.result()
+            except Exception as e:
+                self._indicator_error = f"{self._config.models.indicator}: {e}"
+            else:
+                self._indicator = ObjectLoader(mesh, keep_vertices=False)
+            self._indicator_mesh = None
+        if self._awaited_model is None:
+            return
+
+        model = self._models.request(*self._awaited_model)
+        if model is not None:
+            self._model = model
+            self._model_matrix = glm.mat4(1.0)
+            self._model_source = self._awaited_model
+            self._awaited_model = None
+            self._reset_time()
+        elif self._models.loading is None or self._models.error is not None:
+            self._awaited_model = None
+
+    def _report_startup(self):
+        elapsed = time.perf_counter() - self._start_time
+        for name, ready in (
+            ("first frame", True),
+            ("model", self._model is not None),
+            ("indicator", self._indicator is not None),
+        ):
+            if ready and name not in self._startup_times:
+                self._startup_times[name] = elapsed
+                print(f"Startup: {name} after {elapsed * 1000:.0f} ms")
+
+    def _reload_shaders(self, reloader):
+        swapped = reloader.poll()
+        if not swapped:
+            return
+
+        # Captured triangles and uniforms set once belong to the old programs
+        if self._capture is not None:
+            self._capture.invalidate()
+        if self._governor is not None:
+            self._apply_quality(self._governor.level)
+
+    def _reset_time(self):
+        self._simulation_clock.reset()
+        self._time = 0
 
-        self._model = ObjectLoader(self._new_model_path, self._new_model_format)
-        self._model_matrx = glm.mat4(1.0)
+    def _timeline_state(self):
+        return {
+            "magnitude": self._magnitude,
+            "explosion_origin": list(self._explosion_origin),
+            "falloff_strength": self._falloff_strength,
+            "falloff_radius": self._falloff_radius,
+            "random_strength": self._random_strength,
+            "impulse_decay": self._impulse_decay,
+            "gravity_power": self._gravity_power,
+            "seed": self._seed,
+            "model": list(self._model_source),
+        }
+
+    def _replay_frame(self, player):
+        frame = player.next_frame()
+        if frame is None:
+            self._running = False
+            return
+
+        state = frame.get("state")
+        if state is not None:
+            self._magnitude = state["magnitude"]
+            self._explosion_origin = list(state["explosion_origin"])
+            self._falloff_strength = state["falloff_strength"]
+            self._falloff_radius = state["falloff_radius"]
+            self._random_strength = state["random_strength"]
+            self._impulse_decay = state["impulse_decay"]
+            self._gravity_power = state["gravity_power"]
+            self._indicator_model_matrix = glm.translate(
+                glm.mat4(1.0), glm.vec3(*self._explosion_origin)
+            )
+
+            if state["seed"] != self._seed:
+                self._seed = state["seed"]
+                if self._instances is not None:
+                    self._instances.reseed(self._seed)
+
+            source = tuple(state["model"])
+            if source != self._model_source:
+                self._model = self._models.get(*source)
+                self._model_matrix = glm.mat4(1.0)
+                self._model_source = source
+
+        self._time = frame["time"]
+        self._camera.set_state(frame["camera"])
 
     def _render_ui(self):
         glUseProgram(0)
@@ -166,14 +521,44 @@ class Window:
 
         if imgui.button("Reset & reseed"):
             self._seed = random.random() * 100
+            if self._instances is not None:
+                self._instances.reseed(self._seed)
             self._reset_simulation()
 
+        if self._instances is not None:
+            imgui.text(f"Instances: {self._instances.count}")
+        model = self._model
+        if model is not None:
+            imgui.text(f"Vertex data: {model.bytes_per_triangle:.1f} bytes/triangle")
+            if self._config.rendering.partition_explosion:
+                affected, _ = self._partition(model)
+                imgui.text(
+                    f"Affected triangles: {affected[1].sum() // 3}"
+                    f" / {model.vertex_count // 3}"
+                )
+
+        loading = self._models.loading
+        if loading is not None:
+            stage, progress = loading
+            imgui.progress_bar(progress, (0, 0), f"{stage} model")
+        if self._models.error is not None:
+            imgui.text(f"Failed to load model: {self._models.error}")
+        if self._indicator_error is not None:
+            imgui.text(f"Failed to load indicator: {self._indicator_error}")
+
         imgui.text("Settings below take effect after reset")
 
         if imgui.button("Choose model"):
+            import tkinter as tk
+            from tkinter import filedialog
+
             root = tk.Tk()
             root.withdraw()
-            self._new_model_path = filedialog.askopenfilename()
+            path = filedialog.askopenfilename()
+            # A cancelled dialog returns an empty path
+            if path:
+                self._new_model_path = path
+                self._models.prefetch(self._new_model_path, self._new_model_format)
 
         imgui.same_line()
         imgui.text(f"Path: {self._new_model_path}")
@@ -207,6 +592,29 @@ class Window:
             "Gravity power", self._new_gravity_power, 0.1, format="%.3f"
         )
 
+        if self._gl_calls is not None:
+            imgui.text(f"GL calls per frame: {self._gl_calls.last_frame}")
+
+        if self._shader_reloader is not None and self._shader_reloader.error:
+            imgui.text(f"Shader reload failed: {self._shader_reloader.error}")
+
+        if self._governor is not None:
+            level = self._governor.level
+            imgui.text(
+                f"Quality: subdivision {level.subdivision}, {level.samples}x MSAA"
+                f", {level.scale:.0%} resolution"
+            )
+
+        profiler = self._profiler
+        if profiler is not None:
+            for name, elapsed in self._startup_times.items():
+                imgui.text(f"Startup {name}: {elapsed * 1000:.0f} ms")
+            imgui.text("p50 / p95 / p99 [ms]")
+            for name in profiler.phases:
+                cpu = self._format_percentiles(profiler.percentiles(name, False))
+                gpu = self._format_percentiles(profiler.percentiles(name, True))
+                imgui.text(f"{name}: CPU {cpu}, GPU {gpu}")
+
         imgui.end()
 
         imgui.render()
@@ -218,43 +626,124 @@ class Window:
         glClear(GL_DEPTH_BUFFER_BIT)
         glUseProgram(self._shader.program)
 
-        should_explode = glGetUniformLocation(self._shader.program, "should_explode")
-        time = glGetUniformLocation(self._shader.program, "time")
-        magnitude = glGetUniformLocation(self._shader.program, "magnitude")
-        explosion_origin = glGetUniformLocation(
-            self._shader.program, "explosion_origin"
-        )
-        falloff_radius = glGetUniformLocation(self._shader.program, "falloff_radius")
-        falloff_strength = glGetUniformLocation(
-            self._shader.program, "falloff_strength"
-        )
-        random_strength = glGetUniformLocation(self._shader.program, "random_strength")
-        impulse_decay = glGetUniformLocation(self._shader.program, "impulse_decay")
-        gravity_power = glGetUniformLocation(self._shader.program, "gravity_power")
-        seed = glGetUniformLocation(self._shader.program, "seed")
-
-        glUniform1f(time, self._time)
-        glUniform1f(magnitude, self._magnitude)
-        glUniform3f(
-            explosion_origin,
-            self._explosion_origin[0],
-            self._explosion_origin[1],
-            self._explosion_origin[2],
-        )
-        glUniform1f(falloff_radius, self._falloff_radius)
-        glUniform1f(falloff_strength, self._falloff_strength)
-        glUniform1f(random_strength, self._random_strength)
-        glUniform1f(impulse_decay, 1 - self._impulse_decay)
-        glUniform1f(gravity_power, self._gravity_power)
-        glUniform1f(seed, self._seed)
+        self._simulation_uniforms.set("time", self._time)
+        self._simulation_uniforms.set("magnitude", self._magnitude)
+        self._simulation_uniforms.set("explosion_origin", self._explosion_origin)
+        self._simulation_uniforms.set("falloff_radius", self._falloff_radius)
+        self._simulation_uniforms.set("falloff_strength", self._falloff_strength)
+        self._simulation_uniforms.set("random_strength", self._random_strength)
+        self._simulation_uniforms.set("impulse_decay", 1 - self._impulse_decay)
+        self._simulation_uniforms.set("gravity_power", self._gravity_power)
+        self._simulation_uniforms.set("seed", self._seed)
+        self._simulation_uniforms.upload()
+
+        self._camera.upload_uniforms(self._camera_uniforms)
 
-        self._camera.upload_uniforms(self._shader.program)
+        should_explode = self._shader.location("should_explode")
 
         glUniform1i(should_explode, 1)
-        self._model.render(self._shader.program, self._model_matrix)
+        if self._model is not None:
+            with self._phase("model"):
+                self._render_model()
 
+        glUseProgram(self._shader.program)
         glUniform1i(should_explode, 0)
-        self._indicator.render(self._shader.program, self._indicator_model_matrix)
+        if self._indicator is not None:
+            with self._phase("indicator"):
+                self._indicator.render(self._shader, self._indicator_model_matrix)
+
+    def _phase(self, name):
+        if self._profiler is None:
+            return nullcontext()
+        return self._profiler.phase(name)
+
+    def _format_percentiles(self, percentiles):
+        if percentiles is None:
+            return "-"
+        return " / ".join(f"{value:.2f}" for value in percentiles)
+
+    def _render_model(self):
+        model = self._model
+        if model is None:
+            return
+
+        if "BAKED_EXPLOSION" in self._shader.defines:
+            model.bake(
+                self._model_matrix,
+                self._explosion_origin,
+                self._falloff_radius,
+                self._falloff_strength,
+                self._random_strength,
+                self._seed,
+            )
+
+        if self._capture is None:
+            visible = None
+            if self._config.rendering.culling:
+                visible = model.cull(
+                    self._model_matrix,
+                    self._camera.view_projection,
+                    self._config.rendering.cluster_triangles,
+                    self._time,
+                    self._explosion_origin,
+                    self._magnitude,
+                    self._falloff_radius,
+                    self._falloff_strength,
+                    1 - self._impulse_decay,
+                    self._gravity_power,
+                )
+            partition = None
+            if self._config.rendering.partition_explosion:
+                partition = self._partition(model)
+            model.render(
+                self._shader, self._model_matrix, self._instances, visible, partition
+            )
+            return
+
+        # While nothing affecting the explosion changes, the captured triangles
+        # are drawn again instead of running the geometry shader
+        repeat = 1 if self._instances is None else self._instances.count
+        state = (
+            self._time,
+            self._magnitude,
+            tuple(self._explosion_origin),
+            self._falloff_radius,
+            self._falloff_strength,
+            self._random_strength,
+            self._impulse_decay,
+            self._gravity_power,
+            self._seed,
+            model,
+            tuple(self._model_matrix.to_tuple()),
+        )
+        if self._capture.matches(state):
+            self._capture.replay(model, repeat)
+            return
+
+        if self._compute is not None:
+            self._capture.compute(
+                state,
+                model.vertex_count * repeat,
+                lambda: model.dispatch(
+                    self._compute, self._model_matrix, self._instances
+                ),
+            )
+            self._capture.replay(model, repeat)
+            return
+
+        self._capture.record(
+            state,
+            model.vertex_count * repeat,
+            lambda: model.render(self._shader, self._model_matrix, self._instances),
+        )
+
+    def _partition(self, model):
+        return model.partition(
+            self._model_matrix,
+            [self._explosion_origin],
+            self._falloff_radius,
+            self._falloff_strength,
+        )
 
     def _handle_input(self, events: list[Event], mouse_rel: tuple[int, int]):
         for event in events:
@@ -286,6 +775,21 @@ class Window:
                 self._camera.mouse_callback(dx, dy)
 
     def _cleanup(self):
+        if self._recorder is not None:
+            self._recorder.close()
+        if self._profiler is not None:
+            self._profiler.close()
+        if self._render_target is not None:
+            self._render_target.close()
         glDeleteProgram(self._shader.program)
-        self._model.close()
-        self._indicator.close()
+        if self._capture is not None:
+            self._capture.close()
+        if self._compute is not None:
+            glDeleteProgram(self._compute.program)
+        self._camera_uniforms.close()
+        self._simulation_uniforms.close()
+        self._models.close()
+        if self._indicator is not None:
+            self._indicator.close()
+        if self._instances is not None:
+            self._instances.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from clock import SimulationClock
+
+STEP = 0.25
+
+
+def advance(clock, deltas):
+    return [clock.advance(delta) for delta in deltas]
+
+
+def test_fixed_advances_in_whole_steps():
+    clock = SimulationClock("fixed", STEP, 1.0, False)
+
+    times = advance(clock, [0.1, 0.1, 0.1, 0.6])
+
+    assert times == [0.0, 0.0, 0.25, 0.75]
+
+
+def test_fixed_without_interpolation_ignores_frame_times():
+    uneven = SimulationClock("fixed", STEP, 1.0, False)
+    even = SimulationClock("fixed", STEP, 1.0, False)
+
+    advance(uneven, [0.3, 0.05, 0.4, 0.25])
+    advance(even, [0.25, 0.25, 0.25, 0.25])
+
+    assert uneven.time == even.time == 1.0
+
+
+def test_fixed_interpolates_between_the_last_two_steps():
+    clock = SimulationClock("fixed", STEP, 1.0, True)
+
+    assert clock.advance(0.1) == 0.0
+    # Two steps taken, 0.1 of a 0.25 step left over: 40 % from 0.25 to 0.5
+    assert clock.advance(0.5) == pytest.approx(0.25 + 0.4 * STEP)
+    # Never ahead of the last fixed step
+    assert clock.advance(0.14) <= 0.5
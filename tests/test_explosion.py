@@ -0,0 +1,166 @@
+import math
+
+import numpy as np
+import pytest
+
+from config import SimulationConfig
+from explosion import (
+    bake_explosion,
+    explode_triangles,
+    falloff,
+    gravity,
+    impulse,
+    rand,
+    surface_normal,
+)
+
+F = np.float32
+SEED = 42.0
+ORIGIN = (0.0, 0.0, 0.0)
+FALLOFF_RADIUS = 3.0
+FALLOFF_STRENGTH = 2.0
+RANDOM_STRENGTH = 0.5
+MAGNITUDE = 4
+IMPULSE_DECAY = 0.3
+GRAVITY_POWER = 0.7
+TIMES = [0.0, 0.25, 1.0, 3.5]
+
+SIMULATION = SimulationConfig(
+    time_multiplier=1.0,
+    magnitude=MAGNITUDE,
+    stopped=False,
+    explosion_origin=list(ORIGIN),
+    falloff_strength=FALLOFF_STRENGTH,
+    falloff_radius=FALLOFF_RADIUS,
+    random_strength=RANDOM_STRENGTH,
+    impulse_decay=IMPULSE_DECAY,
+    gravity_power=GRAVITY_POWER,
+)
+
+TRIANGLES = {
+    "near origin": [[0.1, 0.2, 0.3], [0.9, 0.1, 0.2], [0.3, 0.8, 0.1]],
+    "inside falloff": [[1.2, -0.4, 0.7], [1.9, 0.3, -0.2], [0.8, 1.1, 0.5]],
+    # The center (3, 0, 0) lies exactly on the falloff radius
+    "on falloff radius": [[2.0, -1.0, 0.0], [4.0, -1.0, 0.0], [3.0, 2.0, 0.0]],
+    "outside falloff": [[5.0, 1.0, 2.0], [6.0, 1.5, 2.5], [5.5, 3.0, 1.0]],
+    # Every rand() argument is zero, so rand_dir normalizes a zero vector
+    "nan rand_dir": [[0.0, 0.0, 1.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+}
+
+# Captured from geometry-shader.geom with transform feedback on Mesa llvmpipe,
+# with the parameters above: randomise_vec(dir) * falloff(dist) as the offset
+# of every corner at impulse() = 1 and gravity_power = 0, and the face normal.
+# Exploding at any other time moved the corners by offset * impulse() +
+# gravity() to within 1e-6.
+SHADER_OFFSETS = {
+    "near origin": [0.458639294, 0.411185801, 0.170045704],
+    "inside falloff": [0.237568617, 0.086014003, 0.14352864],
+    "on falloff radius": [0.0, 0.0, 0.0],
+    "outside falloff": [0.0, 0.0, 0.0],
+    "nan rand_dir": [0.0, 0.0, 0.0],
+}
+SHADER_NORMALS = {
+    "near origin": [0.15227744, 0.266485482, 0.951733768],
+    "inside falloff": [0.648348749, 0.267912656, 0.712647676],
+    "on falloff radius": [0.0, 0.0, 1.0],
+    "outside falloff": [-0.572077513, 0.4767313, 0.667423785],
+    "nan rand_dir": [0.577350259, 0.577350259, 0.577350259],
+}
+# rand() multiplies sin() by 43758.5453 and keeps the fraction, so last-bit
+# differences in dot() and sin() between GLSL implementations and NumPy move
+# the random direction by a few hundredths
+RANDOM_TOLERANCE = 0.05
+
+
+def bake(triangles):
+    return bake_explosion(
+        triangles, ORIGIN, FALLOFF_RADIUS, FALLOFF_STRENGTH, RANDOM_STRENGTH, SEED
+    )
+
+
+def test_falloff_by_hand():
+    lengths = np.array([0.0, 1.5, 3.0, 4.0], dtype=F)
+
+    # (1 - length / 3) ^ 2, clamped to [0, 1]
+    np.testing.assert_allclose(falloff(lengths, 3.0, 2.0), [1.0, 0.25, 0.0, 0.0])
+
+
+def test_impulse_and_gravity_by_hand():
+    # 3 * 4 ^ 0.5 and (0, -1, 0) * 0.5 * 2 * 2
+    assert impulse(4.0, 0.5, 3) == pytest.approx(6.0)
+    np.testing.assert_allclose(gravity(2.0, 0.5), [0.0, -2.0, 0.0])
+
+
+def test_rand_of_zero_is_zero():
+    assert rand(np.zeros((1, 2), dtype=F))[0] == 0.0
+
+
+def test_surface_normal_by_hand():
+    # -normalize(cross(c0 - c1, c2 - c1)) for the unit triangle in z = 0
+    corners = np.array([[[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]], F)
+
+    np.testing.assert_allclose(surface_normal(corners)[0], [0.0, 0.0, 1.0])
+
+
+@pytest.mark.parametrize("name", TRIANGLES)
+def test_bake_matches_shader(name):
+    corners = np.array(TRIANGLES[name], dtype=F)
+
+    offsets, normals = bake(corners[None])
+
+    assert offsets.dtype == F and normals.dtype == F
+    np.testing.assert_allclose(offsets[0], SHADER_OFFSETS[name], atol=RANDOM_TOLERANCE)
+    np.testing.assert_allclose(normals[0], SHADER_NORMALS[name], atol=1e-6)
+
+
+def test_bake_is_per_triangle():
+    triangles = np.array(list(TRIANGLES.values()), dtype=F)
+
+    offsets, normals = bake(triangles)
+
+    for i, corners in enumerate(triangles):
+        one_offset, one_normal = bake(corners[None])
+        np.testing.assert_array_equal(offsets[i], one_offset[0])
+        np.testing.assert_array_equal(normals[i], one_normal[0])
+
+
+def test_on_falloff_radius_does_not_move():
+    offsets, _ = bake(np.array([TRIANGLES["on falloff radius"]], dtype=F))
+
+    np.testing.assert_array_equal(offsets, np.zeros((1, 3), dtype=F))
+
+
+def test_nan_rand_dir_does_not_move():
+    offsets, normals = bake(np.array([TRIANGLES["nan rand_dir"]], dtype=F))
+
+    assert np.isfinite(offsets).all()
+    np.testing.assert_array_equal(offsets, np.zeros((1, 3), dtype=F))
+    assert np.isfinite(normals).all()
+
+
+def test_inside_falloff_moves_away_from_origin():
+    corners = np.array(TRIANGLES["inside falloff"], dtype=F)
+
+    offsets, _ = bake(corners[None])
+
+    center = corners.mean(axis=0)
+    assert np.linalg.norm(offsets[0]) > 0
+    assert np.dot(offsets[0], center) > 0
+
+
+@pytest.mark.parametrize("name", TRIANGLES)
+def test_explode_matches_shader(name):
+    corners = np.array(TRIANGLES[name], dtype=F)
+
+    exploded, normals = explode_triangles(corners[None], SIMULATION, SEED, TIMES)
+
+    assert exploded.shape == (len(TIMES), 1, 3, 3) and exploded.dtype == F
+    for i, time in enumerate(TIMES):
+        # The shader is given 1 - impulse_decay
+        scale = MAGNITUDE * math.pow(time, 1 - IMPULSE_DECAY)
+        drop = GRAVITY_POWER * time * time
+        expected = corners + np.array(SHADER_OFFSETS[name]) * scale - [0, drop, 0]
+        np.testing.assert_allclose(
+            exploded[i, 0], expected, atol=RANDOM_TOLERANCE * scale + 1e-5
+        )
+    np.testing.assert_allclose(normals[0], SHADER_NORMALS[name], atol=1e-6)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from export import VertexCacheWriter, read_vertex_cache
+
+RECORDS = [
+    {"name": "body", "vbo_range": [0, 6]},
+    {"name": "wheel", "vbo_range": [6, 3]},
+]
+TIMES = [0.0, 0.5, 1.25]
+
+
+def frames():
+    rng = np.random.default_rng(3)
+    corners = [rng.uniform(-5.0, 5.0, size=(3, 3, 3)).astype(np.float32) for _ in TIMES]
+    # Every corner of the last frame lies in the plane z = 2
+    corners[-1][..., 2] = 2.0
+    return corners
+
+
+def round_trip(tmp_path, precision):
+    path = tmp_path / f"{precision}.cache"
+    writer = VertexCacheWriter(path, RECORDS, 9, precision)
+    try:
+        for time, corners in zip(TIMES, frames()):
+            writer.write(time, corners)
+    finally:
+        writer.close()
+    return list(read_vertex_cache(path))
+
+
+@pytest.mark.parametrize("precision", ["float32", "float16", "uint16"])
+def test_vertex_cache_round_trip(tmp_path, precision):
+    written = frames()
+
+    read = round_trip(tmp_path, precision)
+
+    assert [time for time, _ in read] == TIMES
+    for (_, positions), corners in zip(read, written):
+        assert positions.shape == (9, 3) and positions.dtype == np.float32
+        expected = corners.reshape(-1, 3)
+        if precision == "float32":
+            np.testing.assert_array_equal(positions, expected)
+        elif precision == "float16":
+            np.testing.assert_allclose(positions, expected, rtol=2**-11, atol=0)
+        else:
+            # Half a quantisation step of each axis, plus float32 rounding
+            extent = expected.max(axis=0) - expected.min(axis=0)
+            bound = extent / 65535 / 2 + 1e-5
+            assert (np.abs(positions - expected) <= bound).all()
+
+
+@pytest.mark.parametrize("precision", ["float32", "float16", "uint16"])
+def test_vertex_cache_keeps_flat_axis(tmp_path, precision):
+    _, positions = round_trip(tmp_path, precision)[-1]
+
+    np.testing.assert_array_equal(positions[:, 2], np.full(9, 2.0, dtype=np.float32))
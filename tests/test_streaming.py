@@ -0,0 +1,46 @@
+import tracemalloc
+
+import pytest
+
+from loader import Mesh
+from streaming_memory import write_grid
+
+CHUNK_BYTES = 2 * 1024 * 1024
+SMALL_TRIANGLES = 100_000
+# Bytes of the N3F_V3F vertices of one triangle once parsed
+TRIANGLE_BYTES = 3 * 6 * 4
+
+
+def stream_peak(path, n_triangles):
+    # (peak traced bytes, triangle count) of streaming a grid of n_triangles.
+    # The memory-mapped vertices are backed by the file and not counted.
+    triangles = write_grid(path, n_triangles)
+
+    tracemalloc.start()
+    try:
+        mesh = Mesh(path, "N3F_V3F", chunk_bytes=CHUNK_BYTES)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(mesh.vertices) // mesh.floats_per_vertex == triangles * 3
+    return peak, triangles
+
+
+@pytest.mark.slow
+def test_streaming_memory_does_not_grow_with_the_mesh(tmp_path):
+    small, _ = stream_peak(tmp_path / "small.obj", SMALL_TRIANGLES)
+    large, _ = stream_peak(tmp_path / "large.obj", 1_000_000)
+
+    # Ten times the triangles, the same chunk sized buffers
+    assert large < small * 1.25
+
+
+@pytest.mark.slow
+def test_streaming_10m_triangles(tmp_path):
+    small, _ = stream_peak(tmp_path / "small.obj", SMALL_TRIANGLES)
+    large, triangles = stream_peak(tmp_path / "large.obj", 10_000_000)
+
+    assert large < small * 1.25
+    # Parsing in memory needs at least the 690 MiB of vertices
+    assert large < triangles * TRIANGLE_BYTES / 4